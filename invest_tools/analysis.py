@@ -1,18 +1,25 @@
+import hashlib
 import typing
+from functools import cached_property
 
 import numpy as np
 import pandas as pd
 import statsmodels.formula.api as smf
 from scipy import stats
 
+from invest_tools import drawdown, resample
+from invest_tools.log import logger
+
 
 def calculate_mean_daily_returns(clean_returns: pd.Series) -> np.ndarray:
     return np.mean(clean_returns)
 
 
-def calculate_mean_annual_return(clean_returns: pd.Series) -> float:
+def calculate_mean_annual_return(
+    clean_returns: pd.Series, periods_per_year: int = 252
+) -> float:
     mean_returns = calculate_mean_daily_returns(clean_returns)
-    return ((1 + mean_returns) ** 252) - 1
+    return ((1 + mean_returns) ** periods_per_year) - 1
 
 
 def calculate_std_daily(clean_returns: pd.Series) -> np.ndarray:
@@ -51,7 +58,9 @@ def calculate_beta_cov(backtest_data: pd.DataFrame) -> float:
     $$ \beta P = \frac{Cov(RP, RB)}{Var(RB)} $$
     """
     covariance_matrix = backtest_data.cov()
-    covariance_coefficient = covariance_matrix.iloc[0, 1]
+    covariance_coefficient = covariance_matrix.loc[
+        "portfolio_returns", "benchmark_returns"
+    ]
     benchmark_variance = backtest_data["benchmark_returns"].var()
     portfolio_beta = covariance_coefficient / benchmark_variance
     return portfolio_beta
@@ -66,11 +75,214 @@ def calculate_beta_capm(backtest_data: pd.DataFrame) -> float:
     return regression_beta
 
 
-def calculate_max_drawdown(cumulative_returns: pd.Series) -> np.ndarray:
+def calculate_max_drawdown(clean_returns: pd.Series) -> float:
+    """
+    Calculate the deepest historical drawdown of wealth built from the returns
+    """
+    return drawdown.calculate_max_drawdown(clean_returns)
+
+
+class InvalidMetric(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+
+
+class MetricContext:
+    """
+    The returns being analysed along with intermediate values that several
+    metrics need. Each intermediate is calculated at most once per context so
+    metrics requested together share the work.
+
+    `periods_per_year` annualises per-period values. When it is not given it
+    is inferred from the dates of the returns, or 252 without dates.
+    """
+
+    def __init__(
+        self,
+        clean_returns: pd.Series,
+        backtest: pd.DataFrame = None,
+        periods_per_year: int = None,
+    ):
+        self.clean_returns = clean_returns
+        self.backtest = backtest if backtest is not None else pd.DataFrame()
+        if periods_per_year is None:
+            dates = None
+            if isinstance(clean_returns.index, pd.DatetimeIndex):
+                dates = clean_returns.index.to_series()
+            periods_per_year = resample.periods_per_year(dates=dates)
+        self.periods_per_year = periods_per_year
+
+    @cached_property
+    def values(self) -> np.ndarray:
+        return np.asarray(self.clean_returns, dtype=float)
+
+    @cached_property
+    def mean(self) -> float:
+        return self.values.mean()
+
+    @cached_property
+    def centred(self) -> np.ndarray:
+        return self.values - self.mean
+
+    @cached_property
+    def moments(self) -> typing.Tuple[float, float, float]:
+        """
+        The second, third and fourth central moments of the returns.
+        """
+        squared = self.centred * self.centred
+        return squared.mean(), (squared * self.centred).mean(), (squared**2).mean()
+
+    @cached_property
+    def std(self) -> float:
+        return np.sqrt(self.moments[0])
+
+    @cached_property
+    def skew(self) -> float:
+        variance, third, _ = self.moments
+        return third / variance**1.5 if variance > 0 else np.nan
+
+    @cached_property
+    def kurtosis(self) -> float:
+        variance, _, fourth = self.moments
+        return fourth / variance**2 - 3 if variance > 0 else np.nan
+
+    @cached_property
+    def has_benchmark(self) -> bool:
+        return "benchmark_returns" in self.backtest
+
+    @cached_property
+    def benchmark_data(self) -> pd.DataFrame:
+        return self.backtest[["portfolio_returns", "benchmark_returns"]]
+
+    @cached_property
+    def benchmark_covariance(self) -> np.ndarray:
+        """
+        Covariance of portfolio and benchmark returns over the periods where
+        both have a value.
+        """
+        complete = self.benchmark_data.dropna().to_numpy(dtype=float)
+        if len(complete) < 2:
+            return np.full((2, 2), np.nan)
+        return np.cov(complete, rowvar=False)
+
+    @cached_property
+    def beta(self) -> float:
+        """
+        Covariance of the portfolio with the benchmark over the benchmark
+        variance, which is also the least squares CAPM slope.
+        """
+        covariance = self.benchmark_covariance
+        if not covariance[1, 1] > 0:
+            return np.nan
+        return covariance[0, 1] / covariance[1, 1]
+
+    @cached_property
+    def shapiro(self) -> typing.Tuple[float, float]:
+        return calculate_shapiro(self.clean_returns)
+
+
+MetricFunction = typing.Callable[[MetricContext], typing.Any]
+
+METRICS: typing.Dict[str, MetricFunction] = {}
+BENCHMARK_METRICS = set()
+
+
+def register_metric(
+    name: str, func: MetricFunction = None, requires_benchmark: bool = False
+):
+    """
+    Register a metric so it can be requested by name from `calculate_metrics`.
+
+    The function takes a `MetricContext` and returns the metric value. Can be
+    used directly or as a decorator:
+
+    ```
+        @analysis.register_metric("sortino")
+        def sortino(context):
+            downside = context.values[context.values < 0]
+            return context.mean / downside.std()
+    ```
+    """
+
+    def decorator(f: MetricFunction) -> MetricFunction:
+        METRICS[name] = f
+        if requires_benchmark:
+            BENCHMARK_METRICS.add(name)
+        else:
+            BENCHMARK_METRICS.discard(name)
+        return f
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+def metric_identity(name: str) -> str:
     """
-    Calculate historical drawdown
+    Identify the function registered for a metric by its name and code, so
+    cached results are recalculated when a metric is registered again.
+    """
+    f = METRICS.get(name)
+    code = getattr(f, "__code__", None)
+    parts = [getattr(f, "__module__", ""), getattr(f, "__qualname__", repr(f))]
+    if code is not None:
+        parts += [code.co_code.hex(), repr(code.co_consts), repr(code.co_names)]
+    parts.append(str(name in BENCHMARK_METRICS))
+    digest = hashlib.blake2b("|".join(parts).encode(), digest_size=8).hexdigest()
+    return f"{name}:{digest}"
+
+
+register_metric("daily_returns", lambda c: c.mean)
+register_metric("annual_returns", lambda c: ((1 + c.mean) ** c.periods_per_year) - 1)
+register_metric("daily_std", lambda c: c.std)
+register_metric("annual_std", lambda c: c.std * np.sqrt(c.periods_per_year))
+register_metric("daily_var", lambda c: c.std**2)
+register_metric("skew", lambda c: c.skew)
+register_metric("kurtosis", lambda c: c.kurtosis)
+register_metric("beta_covariance", lambda c: c.beta, requires_benchmark=True)
+register_metric("beta_capm", lambda c: c.beta, requires_benchmark=True)
+register_metric("max_drawdown", lambda c: calculate_max_drawdown(c.clean_returns))
+register_metric("shapiro", lambda c: c.shapiro[0])
+register_metric("shapiro_p_value", lambda c: c.shapiro[1])
+
+DEFAULT_METRICS = [
+    "daily_returns",
+    "annual_returns",
+    "daily_std",
+    "daily_var",
+    "skew",
+    "kurtosis",
+    "beta_covariance",
+    "beta_capm",
+    "max_drawdown",
+]
+
+
+def calculate_metrics(
+    clean_returns: pd.Series,
+    backtest: pd.DataFrame = None,
+    metrics: typing.Iterable[str] = None,
+    periods_per_year: int = None,
+) -> typing.Dict[str, typing.Any]:
+    """
+    Calculate the requested registered metrics, `DEFAULT_METRICS` if none are
+    given. Metrics that need a benchmark are NaN when the backtest has none.
+    Annualised metrics use `periods_per_year`, inferred from the dates of the
+    returns when not given.
+
+    :returns: Dictionary of metric name to value
+    :rtype: typing.Dict[str, typing.Any]
     """
-    running_max = np.maximum.accumulate(cumulative_returns)
-    running_max[running_max < 1] = 1
-    drawdown = cumulative_returns / running_max - 1
-    return np.max(np.array(drawdown))
+    metrics = DEFAULT_METRICS if metrics is None else list(metrics)
+    unknown = [m for m in metrics if m not in METRICS]
+    if unknown:
+        raise InvalidMetric(f"unknown metrics: {unknown}")
+    context = MetricContext(clean_returns, backtest, periods_per_year)
+    results = {}
+    for metric in metrics:
+        if metric in BENCHMARK_METRICS and not context.has_benchmark:
+            logger.warning(f"{metric} needs a benchmark, run `.get_benchmark()`")
+            results[metric] = np.nan
+        else:
+            results[metric] = METRICS[metric](context)
+    return results
@@ -0,0 +1,206 @@
+import hashlib
+import os
+import pickle  # nosec B403
+import typing
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from invest_tools.log import logger
+
+MISSING = object()
+SUFFIX = ".pkl"
+DISK_SIZE_FACTOR = 8
+
+
+def fingerprint(obj: typing.Any) -> str:
+    """
+    A cheap content hash of a value used to address cached results.
+
+    Pandas objects are hashed with their index using the vectorised
+    `hash_pandas_object`, numpy arrays by their raw bytes and anything else by
+    its `repr`.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        digest.update(type(obj).__name__.encode())
+        if isinstance(obj, pd.DataFrame):
+            digest.update(repr(list(obj.columns)).encode())
+            digest.update(repr(list(obj.dtypes.astype(str))).encode())
+        else:
+            digest.update(repr((obj.name, str(obj.dtype))).encode())
+        if len(obj) > 0:
+            hashed = pd.util.hash_pandas_object(obj, index=True)
+            digest.update(hashed.to_numpy().tobytes())
+    elif isinstance(obj, np.ndarray):
+        digest.update(repr((obj.shape, str(obj.dtype))).encode())
+        digest.update(np.ascontiguousarray(obj).tobytes())
+    else:
+        digest.update(repr(obj).encode())
+    return digest.hexdigest()
+
+
+def make_key(name: str, *inputs: typing.Any, **params: typing.Any) -> str:
+    """
+    Build a cache key from a result name, its input data and its parameters.
+    """
+    parts = [name] + [fingerprint(i) for i in inputs]
+    parts += [f"{k}={params[k]!r}" for k in sorted(params)]
+    return hashlib.blake2b("|".join(parts).encode(), digest_size=16).hexdigest()
+
+
+class ResultCache:
+    """
+    A least recently used cache of analysis results.
+
+    Entries are addressed by `make_key` so an unchanged input always finds its
+    previous result. Each entry also records the names it depends on so that
+    loading new data can drop everything derived from the old data with
+    `invalidate`.
+
+    When `cache_dir` is given, results are also pickled to disk and read back
+    when they are not held in memory. The directory holds at most
+    `max_disk_size` results, `max_size` times `DISK_SIZE_FACTOR` by default,
+    dropping the least recently used. Only point this at a directory you
+    trust, as the files are unpickled.
+    """
+
+    def __init__(
+        self, max_size: int = 128, cache_dir: str = None, max_disk_size: int = None
+    ):
+        self.max_size = max_size
+        self.max_disk_size = (
+            max_size * DISK_SIZE_FACTOR if max_disk_size is None else max_disk_size
+        )
+        self.cache_dir = cache_dir
+        self.entries = OrderedDict()
+        self.disk_entries = OrderedDict()
+        self.dependencies = {}
+        self.key_dependencies = {}
+        self.hits = 0
+        self.misses = 0
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            for path in sorted(self._disk_files(), key=os.path.getmtime):
+                key = os.path.splitext(os.path.basename(path))[0]
+                self.disk_entries[key] = None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries or key in self.disk_entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _path(self, key: str) -> typing.Optional[str]:
+        if self.cache_dir is None:
+            return None
+        return os.path.join(self.cache_dir, f"{key}{SUFFIX}")
+
+    def _disk_files(self) -> typing.List[str]:
+        return [
+            os.path.join(self.cache_dir, name)
+            for name in os.listdir(self.cache_dir)
+            if name.endswith(SUFFIX)
+        ]
+
+    def get(self, key: str, default: typing.Any = None) -> typing.Any:
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            if key in self.disk_entries:
+                self.disk_entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        if key in self.disk_entries:
+            with open(self._path(key), "rb") as f:
+                value = pickle.load(f)  # nosec B301
+            self.disk_entries.move_to_end(key)
+            self._store(key, value)
+            self.hits += 1
+            return value
+        self.misses += 1
+        return default
+
+    def set(
+        self, key: str, value: typing.Any, depends_on: typing.Iterable[str] = ()
+    ) -> None:
+        for dependency in depends_on:
+            self.dependencies.setdefault(dependency, set()).add(key)
+            self.key_dependencies.setdefault(key, set()).add(dependency)
+        self._store(key, value)
+        path = self._path(key)
+        if path is not None:
+            with open(path, "wb") as f:
+                pickle.dump(value, f)
+            self.disk_entries[key] = None
+            self.disk_entries.move_to_end(key)
+            while len(self.disk_entries) > self.max_disk_size:
+                evicted, _ = self.disk_entries.popitem(last=False)
+                self._remove_file(evicted)
+                if evicted not in self.entries:
+                    self._forget(evicted)
+
+    def _store(self, key: str, value: typing.Any) -> None:
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            evicted, _ = self.entries.popitem(last=False)
+            if evicted not in self.disk_entries:
+                self._forget(evicted)
+
+    def _forget(self, key: str) -> None:
+        """
+        Drop the dependency records of a key that is no longer held anywhere.
+        """
+        for dependency in self.key_dependencies.pop(key, ()):
+            keys = self.dependencies.get(dependency)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.dependencies[dependency]
+
+    def _remove_file(self, key: str) -> None:
+        path = self._path(key)
+        if path is not None and os.path.exists(path):
+            os.remove(path)
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: typing.Callable[[], typing.Any],
+        depends_on: typing.Iterable[str] = (),
+    ) -> typing.Any:
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            value = compute()
+            self.set(key, value, depends_on)
+        return value
+
+    def invalidate(self, dependency: str) -> int:
+        """
+        Drop every entry that depends on `dependency`.
+
+        :returns: The number of entries dropped
+        :rtype: int
+        """
+        keys = self.dependencies.pop(dependency, set())
+        for key in keys:
+            self.entries.pop(key, None)
+            self.disk_entries.pop(key, None)
+            self._remove_file(key)
+            self._forget(key)
+        if keys:
+            logger.debug(f"invalidated {len(keys)} cached results for {dependency}")
+        return len(keys)
+
+    def clear(self) -> None:
+        """
+        Drop every entry, including all results pickled in `cache_dir`.
+        """
+        if self.cache_dir is not None:
+            for path in self._disk_files():
+                os.remove(path)
+        self.entries.clear()
+        self.disk_entries.clear()
+        self.dependencies.clear()
+        self.key_dependencies.clear()
@@ -0,0 +1,266 @@
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import time
+import typing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from invest_tools import analysis, loaders, resample
+from invest_tools.currency import Currency
+from invest_tools.portfolio import Portfolio
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = None
+    pq = None
+
+BATCH_SIZE = 256
+
+_market_data = {}
+
+
+def read_definitions(path: str) -> typing.List[typing.Tuple[str, dict, str]]:
+    """
+    Read portfolio definitions from a JSONL file, one per line, or a directory
+    of JSON files, one per file.
+
+    Each record is either a bare portfolio definition or an object with a
+    `portfolio` definition and optional `name` and base `currency`. Names
+    default to the file name or line number.
+
+    :returns: List of name, definition and base currency (None for default)
+    """
+    records = []
+    if os.path.isdir(path):
+        for file_name in sorted(os.listdir(path)):
+            if file_name.endswith(".json"):
+                with open(os.path.join(path, file_name)) as f:
+                    records.append((os.path.splitext(file_name)[0], json.load(f)))
+    else:
+        with open(path) as f:
+            for i, line in enumerate(f):
+                if line.strip():
+                    records.append((str(i), json.loads(line)))
+    definitions = []
+    for name, record in records:
+        if "portfolio" in record:
+            definitions.append(
+                (
+                    str(record.get("name", name)),
+                    record["portfolio"],
+                    record.get("currency"),
+                )
+            )
+        else:
+            definitions.append((name, record, None))
+    return definitions
+
+
+def _init_worker(market_data: typing.Dict[str, typing.Any], log_level: int) -> None:
+    logging.getLogger().setLevel(log_level)
+    _market_data.clear()
+    _market_data.update(market_data)
+
+
+def _value(value: typing.Any) -> typing.Any:
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def evaluate_portfolio(
+    name: str,
+    definition: dict,
+    base_currency: str,
+    options: typing.Dict[str, typing.Any],
+) -> typing.Dict[str, typing.Any]:
+    """
+    Build and analyse one portfolio against the market data loaded in this
+    process. Failures are reported in the `error` field rather than raised so
+    one bad definition does not stop a batch.
+    """
+    record = {"portfolio": name, "error": None}
+    try:
+        port = Portfolio(definition, Currency(base_currency))
+        for stage, data in _market_data.items():
+            setattr(port, stage, data)
+        port.resample(options.get("frequency"))
+        port.build(
+            rebalance=options.get("rebalance"),
+            threshold=options.get("threshold"),
+            transaction_cost=options.get("transaction_cost", 0.0),
+        )
+        results = port.analyse(metrics=options.get("metrics"))
+        record.update({metric: _value(value) for metric, value in results.items()})
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    return record
+
+
+class JsonlWriter:
+    def __init__(self, path: str = None):
+        self.file = sys.stdout if path is None else open(path, "w")
+
+    def write(self, record: typing.Dict[str, typing.Any]) -> None:
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self) -> None:
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+class ParquetWriter:
+    """
+    Streams records to a Parquet file one row group per `BATCH_SIZE` records.
+    """
+
+    def __init__(self, path: str, metrics: typing.List[str]):
+        if pa is None:
+            raise loaders.MissingDependency(
+                "pyarrow is needed to write Parquet, "
+                "install it with `pip install invest-tools[arrow]`"
+            )
+        self.schema = pa.schema(
+            [("portfolio", pa.string()), ("error", pa.string())]
+            + [(metric, pa.float64()) for metric in metrics]
+        )
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.batch = []
+
+    def write(self, record: typing.Dict[str, typing.Any]) -> None:
+        self.batch.append(record)
+        if len(self.batch) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.batch:
+            table = pa.Table.from_pylist(self.batch, schema=self.schema)
+            self.writer.write_table(table)
+            self.batch = []
+
+    def close(self) -> None:
+        self.flush()
+        self.writer.close()
+
+
+def _progress(done: int, total: int, start: float) -> None:
+    if sys.stderr.isatty():
+        elapsed = time.perf_counter() - start
+        sys.stderr.write(f"\r{done}/{total} portfolios evaluated in {elapsed:.1f}s")
+        sys.stderr.flush()
+
+
+def parse_args(argv: typing.List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="invest-tools",
+        description="Build and analyse a batch of portfolio definitions.",
+    )
+    parser.add_argument(
+        "definitions", help="JSONL file or directory of JSON portfolio definitions"
+    )
+    parser.add_argument("--prices", required=True, help="prices CSV or Parquet")
+    parser.add_argument("--fx", required=True, help="USD/GBP rates CSV or Parquet")
+    parser.add_argument("--benchmark", help="benchmark CSV or Parquet")
+    parser.add_argument(
+        "--base-currency",
+        default=Currency.GBP.value,
+        choices=[c.value for c in Currency],
+        help="currency of portfolios that do not set one",
+    )
+    parser.add_argument(
+        "--metrics", help="comma separated metrics, defaults to all standard metrics"
+    )
+    parser.add_argument(
+        "--frequency",
+        choices=list(resample.PERIODS_PER_YEAR),
+        help="resample the market data to this frequency before building",
+    )
+    parser.add_argument("--rebalance", help="calendar rebalance frequency")
+    parser.add_argument("--threshold", type=float, help="rebalance drift threshold")
+    parser.add_argument("--transaction-cost", type=float, default=0.0)
+    parser.add_argument(
+        "--workers", type=int, default=1, help="number of worker processes"
+    )
+    parser.add_argument(
+        "--output", help="JSONL or .parquet file to write, defaults to stdout"
+    )
+    parser.add_argument("--verbose", action="store_true", help="log every stage")
+    return parser.parse_args(argv)
+
+
+def main(argv: typing.List[str] = None) -> int:
+    args = parse_args(argv)
+    log_level = logging.DEBUG if args.verbose else logging.WARNING
+    logging.getLogger().setLevel(log_level)
+
+    metrics = args.metrics.split(",") if args.metrics else None
+    options = {
+        "metrics": metrics,
+        "frequency": args.frequency,
+        "rebalance": args.rebalance,
+        "threshold": args.threshold,
+        "transaction_cost": args.transaction_cost,
+    }
+
+    start = time.perf_counter()
+    definitions = read_definitions(args.definitions)
+    market_data = loaders.load_market_data(args.prices, args.fx, args.benchmark)
+    loaded = time.perf_counter()
+
+    if args.output is not None and args.output.endswith(loaders.PARQUET_SUFFIXES):
+        writer = ParquetWriter(args.output, metrics or analysis.DEFAULT_METRICS)
+    else:
+        writer = JsonlWriter(args.output)
+
+    tasks = [
+        (name, definition, currency or args.base_currency, options)
+        for name, definition, currency in definitions
+    ]
+    failed = 0
+    try:
+        if args.workers > 1:
+            with ProcessPoolExecutor(
+                max_workers=args.workers,
+                initializer=_init_worker,
+                initargs=(market_data, log_level),
+            ) as executor:
+                futures = [executor.submit(evaluate_portfolio, *t) for t in tasks]
+                for done, future in enumerate(as_completed(futures), start=1):
+                    record = future.result()
+                    failed += record["error"] is not None
+                    writer.write(record)
+                    _progress(done, len(tasks), loaded)
+        else:
+            _init_worker(market_data, log_level)
+            for done, task in enumerate(tasks, start=1):
+                record = evaluate_portfolio(*task)
+                failed += record["error"] is not None
+                writer.write(record)
+                _progress(done, len(tasks), loaded)
+    finally:
+        writer.close()
+
+    finished = time.perf_counter()
+    per_portfolio = (finished - loaded) / max(len(tasks), 1) * 1000
+    if sys.stderr.isatty():
+        sys.stderr.write("\n")
+    sys.stderr.write(
+        f"Loaded market data in {loaded - start:.2f}s, evaluated {len(tasks)} "
+        f"portfolios ({failed} failed) in {finished - loaded:.2f}s "
+        f"({per_portfolio:.1f}ms each) with {args.workers} worker(s)\n"
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
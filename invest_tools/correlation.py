@@ -0,0 +1,118 @@
+import typing
+
+import numpy as np
+import pandas as pd
+from scipy.cluster import hierarchy
+from scipy.spatial import distance
+
+BLOCK_SIZE = 256
+
+
+def pairwise_moments(
+    returns: pd.DataFrame,
+    dtype: typing.Type[np.floating] = np.float64,
+    block_size: int = BLOCK_SIZE,
+) -> typing.Iterator[typing.Tuple[slice, np.ndarray, ...]]:
+    """
+    Centred second moments of every pair of columns over the rows where both
+    have a value, as `DataFrame.corr()` and `DataFrame.cov()` use.
+
+    Rather than looping over pairs, the sums needed for every pair are formed
+    with matrix products of the zero-filled values and the validity mask.
+    They are computed one block of columns at a time so memory is bounded by
+    `block_size * n_columns`.
+
+    :returns: For each block of rows of the pairwise matrices, the block and
+    the count, centred cross-product and centred squares of each column over
+    the shared rows
+    """
+    values = returns.to_numpy(dtype=dtype, na_value=np.nan)
+    mask = ~np.isnan(values)
+    filled = np.where(mask, values, 0).astype(dtype)
+    weights = mask.astype(dtype)
+    squared = filled * filled
+    for start in range(0, values.shape[1], block_size):
+        block = slice(start, start + block_size)
+        count = weights[:, block].T @ weights
+        sum_x = filled[:, block].T @ weights
+        sum_y = weights[:, block].T @ filled
+        sum_xx = squared[:, block].T @ weights
+        sum_yy = weights[:, block].T @ squared
+        sum_xy = filled[:, block].T @ filled
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cross = sum_xy - sum_x * sum_y / count
+            square_x = sum_xx - sum_x * sum_x / count
+            square_y = sum_yy - sum_y * sum_y / count
+        yield block, count, cross, square_x, square_y
+
+
+def calculate_correlation_matrix(
+    returns: pd.DataFrame,
+    dtype: typing.Type[np.floating] = np.float64,
+    block_size: int = BLOCK_SIZE,
+) -> pd.DataFrame:
+    """
+    Calculate the pairwise Pearson correlation of every column of returns,
+    matching `DataFrame.corr()`, from `pairwise_moments`.
+
+    :returns: Square dataframe of correlations labelled by the input columns
+    :rtype: pd.DataFrame
+    """
+    n_columns = returns.shape[1]
+    matrix = np.empty((n_columns, n_columns), dtype=dtype)
+    moments = pairwise_moments(returns, dtype, block_size)
+    for block, _, cross, square_x, square_y in moments:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            correlation = cross / np.sqrt(square_x * square_y)
+        matrix[block] = np.clip(correlation, -1, 1)
+    return pd.DataFrame(matrix, index=returns.columns, columns=returns.columns)
+
+
+def top_correlated_pairs(
+    correlation_matrix: pd.DataFrame, k: int = 10, absolute: bool = True
+) -> pd.DataFrame:
+    """
+    Find the `k` most correlated pairs of securities in a correlation matrix.
+
+    :returns: Dataframe of `first`, `second` and `correlation` sorted by strength
+    :rtype: pd.DataFrame
+    """
+    values = correlation_matrix.to_numpy()
+    rows, cols = np.triu_indices(len(values), k=1)
+    pairs = values[rows, cols]
+    strength = np.abs(pairs) if absolute else pairs
+    strength = np.where(np.isnan(strength), -np.inf, strength)
+    k = min(k, len(pairs))
+    top = np.argpartition(-strength, k - 1)[:k] if k > 0 else np.array([], dtype=int)
+    top = top[np.argsort(-strength[top], kind="stable")]
+    labels = correlation_matrix.columns
+    return pd.DataFrame(
+        {
+            "first": labels[rows[top]],
+            "second": labels[cols[top]],
+            "correlation": pairs[top],
+        }
+    )
+
+
+def cluster_order(correlation_matrix: pd.DataFrame) -> typing.List[str]:
+    """
+    Order securities so that highly correlated ones sit next to each other.
+
+    Uses average linkage hierarchical clustering on the `1 - correlation`
+    distance.
+    """
+    if len(correlation_matrix) < 3:
+        return list(correlation_matrix.columns)
+    dist = 1 - np.nan_to_num(correlation_matrix.to_numpy(dtype=float), nan=0.0)
+    dist = (dist + dist.T) / 2
+    np.fill_diagonal(dist, 0)
+    linkage = hierarchy.linkage(
+        distance.squareform(np.clip(dist, 0, 2), checks=False), method="average"
+    )
+    return list(correlation_matrix.columns[hierarchy.leaves_list(linkage)])
+
+
+def order_matrix(correlation_matrix: pd.DataFrame) -> pd.DataFrame:
+    order = cluster_order(correlation_matrix)
+    return correlation_matrix.loc[order, order]
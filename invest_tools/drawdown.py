@@ -0,0 +1,184 @@
+import typing
+
+import numpy as np
+import pandas as pd
+
+Returns = typing.Union[pd.Series, pd.DataFrame]
+
+
+def _as_frame(returns: Returns) -> pd.DataFrame:
+    if isinstance(returns, pd.Series):
+        return returns.to_frame(returns.name if returns.name is not None else 0)
+    return returns
+
+
+def _underwater(values: np.ndarray) -> np.ndarray:
+    wealth = np.cumprod(1 + np.nan_to_num(values), axis=0)
+    running_max = np.maximum.accumulate(np.maximum(wealth, 1), axis=0)
+    return wealth / running_max - 1
+
+
+def _labels(index: pd.Index, positions: np.ndarray) -> pd.Index:
+    """
+    Index labels at `positions`, missing where the position is negative.
+    """
+    if len(index) == 0:
+        missing = pd.Series(np.nan, index=range(len(positions)))
+        if isinstance(index, pd.DatetimeIndex):
+            missing = pd.to_datetime(missing)
+        return pd.Index(missing)
+    labels = pd.Series(index.take(np.clip(positions, 0, None)))
+    return pd.Index(labels.where(positions >= 0))
+
+
+def calculate_wealth(returns: Returns) -> Returns:
+    """
+    Growth of one unit of capital invested at the start of the returns. Missing
+    returns are treated as flat.
+    """
+    return (1 + returns.fillna(0)).cumprod()
+
+
+def calculate_underwater(returns: Returns) -> Returns:
+    """
+    Calculate the drawdown from the running peak of wealth at every period.
+    The starting capital counts as the first peak so losses from inception
+    are drawdowns.
+
+    Works on a series or column-wise on a dataframe of many return series.
+    """
+    frame = _as_frame(returns)
+    underwater = pd.DataFrame(
+        _underwater(frame.to_numpy(dtype=float)),
+        index=frame.index,
+        columns=frame.columns,
+    )
+    if isinstance(returns, pd.Series):
+        return underwater.iloc[:, 0]
+    return underwater
+
+
+def calculate_max_drawdown(returns: Returns) -> typing.Union[float, pd.Series]:
+    """
+    The deepest drawdown, as a negative fraction of the peak.
+    """
+    underwater = calculate_underwater(returns)
+    if isinstance(underwater, pd.Series):
+        return underwater.min() if len(underwater) else 0.0
+    return underwater.min().fillna(0.0)
+
+
+def drawdown_summary(returns: Returns) -> pd.DataFrame:
+    """
+    Summarise the maximum drawdown of every column of returns in one pass.
+
+    | max_drawdown | peak | trough | recovery | decline_periods | recovery_periods | duration_periods |
+    |--------------|------|--------|----------|-----------------|------------------|------------------|
+
+    `peak` is missing when the drawdown starts from the starting capital and
+    `recovery` is missing when wealth has not yet regained the peak, in which
+    case the periods run to the end of the data. Columns without any returns
+    have no drawdown.
+
+    :returns: Pandas dataframe with a row per column of returns
+    :rtype: pd.DataFrame
+    """
+    frame = _as_frame(returns)
+    underwater = _underwater(frame.to_numpy(dtype=float))
+    n_periods, n_columns = underwater.shape
+    if n_periods == 0:
+        underwater = np.zeros((1, n_columns))
+    columns = np.arange(n_columns)
+    positions = np.arange(len(underwater))[:, None]
+
+    trough = underwater.argmin(axis=0)
+    depth = underwater[trough, columns]
+    in_drawdown = depth < 0
+    at_peak = underwater >= 0
+    last_peak = np.maximum.accumulate(np.where(at_peak, positions, -1), axis=0)
+    peak = last_peak[trough, columns]
+    after_trough = at_peak & (positions > trough)
+    recovered = after_trough.any(axis=0)
+    recovery = np.where(recovered, after_trough.argmax(axis=0), -1)
+    end = np.where(recovered, recovery, n_periods - 1)
+
+    summary = pd.DataFrame(
+        {
+            "max_drawdown": np.where(in_drawdown, depth, 0.0),
+            "peak": _labels(frame.index, np.where(in_drawdown, peak, -1)),
+            "trough": _labels(frame.index, np.where(in_drawdown, trough, -1)),
+            "recovery": _labels(frame.index, np.where(in_drawdown, recovery, -1)),
+            "decline_periods": np.where(in_drawdown, trough - peak, 0),
+            "recovery_periods": np.where(in_drawdown, end - trough, 0),
+            "duration_periods": np.where(in_drawdown, end - peak, 0),
+        },
+        index=frame.columns,
+    )
+    return summary
+
+
+def top_drawdowns(returns: Returns, n: int = 5) -> pd.DataFrame:
+    """
+    The `n` deepest drawdown episodes of every column of returns.
+
+    An episode runs from the last peak to the period wealth regains it. All
+    episodes of all columns are found together by flattening the underwater
+    curves column by column and splitting them into runs below the peak.
+
+    :returns: Pandas dataframe of episodes ordered by depth within each column,
+    with a `column` level in the index when given a dataframe
+    :rtype: pd.DataFrame
+    """
+    frame = _as_frame(returns)
+    underwater = _underwater(frame.to_numpy(dtype=float))
+    n_periods = max(underwater.shape[0], 1)
+    flat = underwater.T.ravel()
+    below = flat < 0
+    column_start = np.arange(flat.size) % n_periods == 0
+    column_end = np.arange(flat.size) % n_periods == n_periods - 1
+    starts = np.flatnonzero(below & (column_start | ~np.roll(below, 1)))
+    ends = np.flatnonzero(below & (column_end | ~np.roll(below, -1)))
+
+    if len(starts) == 0:
+        depth = trough = np.array([], dtype=int)
+    else:
+        depth = np.minimum.reduceat(flat, starts)
+        episode = np.cumsum(np.isin(np.arange(flat.size), starts)) - 1
+        deepest = np.flatnonzero(below & (flat == depth[np.clip(episode, 0, None)]))
+        _, first = np.unique(episode[deepest], return_index=True)
+        trough = deepest[first]
+
+    column = starts // n_periods
+    order = np.lexsort((depth, column))
+    rank = np.arange(len(order)) - np.searchsorted(column[order], column[order])
+    keep = order[rank < n]
+
+    column, starts, ends = column[keep], starts[keep], ends[keep]
+    offset = column * n_periods
+    peak = starts - offset - 1
+    trough = trough[keep] - offset
+    recovered = ends - offset + 1 < n_periods
+    recovery = np.where(recovered, ends - offset + 1, -1)
+    end = np.where(recovered, recovery, n_periods - 1)
+
+    episodes = pd.DataFrame(
+        {
+            "max_drawdown": depth[keep],
+            "peak": _labels(frame.index, peak),
+            "trough": _labels(frame.index, trough),
+            "recovery": _labels(frame.index, recovery),
+            "decline_periods": trough - peak,
+            "recovery_periods": end - trough,
+            "duration_periods": end - peak,
+        }
+    )
+    if isinstance(returns, pd.Series):
+        return episodes
+    episodes.index = pd.MultiIndex.from_arrays(
+        [
+            frame.columns.take(column),
+            np.arange(len(keep)) - np.searchsorted(column, column),
+        ],
+        names=["column", "rank"],
+    )
+    return episodes
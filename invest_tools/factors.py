@@ -0,0 +1,199 @@
+import typing
+
+import numpy as np
+import pandas as pd
+
+BLOCK_SIZE = 64
+MARKET = "market"
+
+
+class InvalidWindow(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+
+
+def align_factors(
+    returns: pd.DataFrame, factors: pd.DataFrame
+) -> typing.Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Line the returns up with the factor returns on their shared dates, dropping
+    dates where any factor is missing. Missing returns are kept and left out
+    of only that column's regression.
+
+    :returns: The aligned returns and factors
+    """
+    factors = factors.dropna(how="any")
+    dates = returns.index.intersection(factors.index)
+    return returns.loc[dates], factors.loc[dates]
+
+
+def _moments(
+    design: np.ndarray, values: np.ndarray, observed: np.ndarray, window: int = None
+) -> typing.Tuple[np.ndarray, ...]:
+    """
+    Cross-products of the design matrix and each column of values over the
+    whole sample, or over every rolling `window` of rows from running sums.
+
+    Each returned array has a leading axis per window end. When every value
+    is observed the columns share one design cross-product.
+    """
+    weights = observed.astype(float)
+    shared = observed.all()
+    if window is None:
+        if shared:
+            xx = (design.T @ design)[None, None]
+        else:
+            xx = np.einsum("tc,tp,tq->cpq", weights, design, design)[None]
+        xy = np.einsum("tc,tp->cp", values, design)[None]
+        yy = (values * values).sum(axis=0)[None]
+        y = values.sum(axis=0)[None]
+        n = weights.sum(axis=0)[None]
+        return xx, xy, yy, y, n
+
+    def windowed(per_row: np.ndarray) -> np.ndarray:
+        running = np.cumsum(per_row, axis=0)
+        running[window:] = running[window:] - running[:-window]
+        return running[window - 1 :]
+
+    outer = design[:, None, :, None] * design[:, None, None, :]
+    xx = windowed(outer if shared else weights[:, :, None, None] * outer)
+    xy = windowed(values[:, :, None] * design[:, None, :])
+    return (
+        xx,
+        xy,
+        windowed(values * values),
+        windowed(values),
+        windowed(weights),
+    )
+
+
+def _least_squares(design: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    Fit every column of values on one fully observed design through a single
+    QR decomposition, falling back to the minimum norm `lstsq` fit when the
+    design is rank deficient.
+    """
+    q, r = np.linalg.qr(design)
+    diagonal = np.abs(np.diag(r))
+    tolerance = max(design.shape) * np.finfo(float).eps * diagonal.max(initial=0)
+    if r.shape[0] < r.shape[1] or not (diagonal > tolerance).all():
+        return np.linalg.lstsq(design, values, rcond=None)[0].T[None]
+    return np.linalg.solve(r, q.T @ values).T[None]
+
+
+def _solve_normal(xx: np.ndarray, xy: np.ndarray, n: np.ndarray) -> np.ndarray:
+    """
+    Solve every regression's normal equations in one batched call. Should any
+    be singular, each is solved on its own and the singular ones by `lstsq`.
+    """
+    n_params = xx.shape[-1]
+    solvable = n > n_params if xx.shape[-3] > 1 else (n > n_params)[..., :1]
+    xx = np.where(solvable[..., None, None], xx, np.eye(n_params))
+    xx, xy = np.broadcast_arrays(xx, xy[..., None])
+    try:
+        return np.linalg.solve(xx, xy)[..., 0]
+    except np.linalg.LinAlgError:
+        params = np.empty(xy.shape[:-1])
+        for i in np.ndindex(xx.shape[:-2]):
+            try:
+                params[i] = np.linalg.solve(xx[i], xy[i])[:, 0]
+            except np.linalg.LinAlgError:
+                params[i] = np.linalg.lstsq(xx[i], xy[i], rcond=None)[0][:, 0]
+        return params
+
+
+def _statistics(
+    params: np.ndarray, xy: np.ndarray, yy: np.ndarray, y: np.ndarray, n: np.ndarray
+) -> typing.Tuple[np.ndarray, ...]:
+    """
+    Derive the fit statistics of every regression from its cross-products.
+    """
+    n_params = params.shape[-1]
+    valid = n > n_params
+    with np.errstate(divide="ignore", invalid="ignore"):
+        residual = np.maximum(yy - (params * xy).sum(axis=-1), 0)
+        total = yy - y * y / n
+        r_squared = np.where(total > 0, 1 - residual / total, np.nan)
+        residual_risk = np.sqrt(residual / (n - n_params))
+    params[~valid] = np.nan
+    r_squared[~valid] = np.nan
+    residual_risk[~valid] = np.nan
+    return params, r_squared, residual_risk
+
+
+def factor_regression(
+    returns: pd.DataFrame,
+    factors: pd.DataFrame,
+    window: int = None,
+    block_size: int = BLOCK_SIZE,
+) -> pd.DataFrame:
+    """
+    Regress every column of returns on the factor returns with an intercept.
+
+    Every column shares the same factor design, so all of the regressions are
+    solved together: the cross-products for a block of columns are formed
+    with a few array operations and their normal equations solved in one
+    batched call. A fully observed block over the whole sample is instead
+    solved from one QR decomposition of the design. With a `window`, the
+    cross-products of every rolling window of that many periods come from
+    running sums, so each window costs the same however long it is. Columns
+    are processed `block_size` at a time to bound memory.
+
+    `alpha` is the intercept per period and `residual_risk` the per-period
+    standard deviation of the residuals. Regressions with no more
+    observations than parameters are missing.
+
+    :returns: Pandas dataframe with a row per column of returns, or per date
+    and column when rolling, of `alpha`, an exposure per factor, `r_squared`,
+    `residual_risk` and `observations`
+    :rtype: pd.DataFrame
+    """
+    if window is not None and window < 1:
+        raise InvalidWindow(f"window must be a positive number of periods: {window}")
+    returns, factors = align_factors(returns, factors)
+    design = np.column_stack([np.ones(len(factors)), factors.to_numpy(dtype=float)])
+    values = returns.to_numpy(dtype=float, na_value=np.nan)
+    observed = ~np.isnan(values)
+    values = np.where(observed, values, 0)
+
+    blocks = []
+    for start in range(0, values.shape[1], block_size):
+        block = slice(start, start + block_size)
+        xx, xy, yy, y, n = _moments(
+            design, values[:, block], observed[:, block], window
+        )
+        if window is None and observed[:, block].all():
+            params = _least_squares(design, values[:, block])
+        else:
+            params = _solve_normal(xx, xy, n)
+        params, r_squared, residual_risk = _statistics(params, xy, yy, y, n)
+        blocks.append(
+            np.concatenate(
+                [
+                    params,
+                    r_squared[..., None],
+                    residual_risk[..., None],
+                    n[..., None],
+                ],
+                axis=-1,
+            )
+        )
+    columns = ["alpha"] + list(factors.columns)
+    columns += ["r_squared", "residual_risk", "observations"]
+    n_windows = 1 if window is None else max(len(values) - window + 1, 0)
+    if blocks:
+        result = np.concatenate(blocks, axis=1)
+    else:
+        result = np.empty((n_windows, 0, len(columns)))
+
+    if window is None:
+        index = pd.Index(returns.columns, name="series")
+    else:
+        index = pd.MultiIndex.from_product(
+            [returns.index[window - 1 :], returns.columns], names=["Date", "series"]
+        )
+    result = pd.DataFrame(
+        result.reshape(-1, len(columns)), index=index, columns=columns
+    )
+    result["observations"] = result["observations"].astype(int)
+    return result
@@ -0,0 +1,116 @@
+import typing
+
+from invest_tools.log import logger
+
+
+class MissingInput(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+
+
+class DependencyGraph:
+    """
+    A small graph of named values. Inputs are set directly, every other node
+    is computed from the nodes it depends on the first time it is requested
+    and then kept until one of its upstream values changes.
+    """
+
+    def __init__(self):
+        self.computations = {}
+        self.depends_on = {}
+        self.dependents = {}
+        self.values = {}
+
+    def add_input(self, name: str, value: typing.Any = None) -> None:
+        self.depends_on[name] = []
+        self.dependents.setdefault(name, set())
+        if value is not None:
+            self.values[name] = value
+
+    def add_node(
+        self,
+        name: str,
+        compute: typing.Callable[[], typing.Any],
+        depends_on: typing.Iterable[str],
+    ) -> None:
+        self.computations[name] = compute
+        self.depends_on[name] = list(depends_on)
+        self.dependents.setdefault(name, set())
+        for dependency in self.depends_on[name]:
+            self.dependents.setdefault(dependency, set()).add(name)
+
+    def is_computed(self, name: str) -> bool:
+        return name in self.values
+
+    def peek(self, name: str, default: typing.Any = None) -> typing.Any:
+        """
+        The current value of a node without computing anything.
+        """
+        return self.values.get(name, default)
+
+    def get(self, name: str) -> typing.Any:
+        """
+        The value of a node, computing it and anything upstream of it that is
+        out of date.
+        """
+        if name in self.values:
+            return self.values[name]
+        if name not in self.computations:
+            raise MissingInput(f"{name} has not been set")
+        for dependency in self.depends_on[name]:
+            self.get(dependency)
+        logger.debug(f"evaluating {name}")
+        self.values[name] = self.computations[name]()
+        return self.values[name]
+
+    def set(self, name: str, value: typing.Any) -> None:
+        """
+        Set the value of a node and invalidate everything downstream of it.
+        """
+        self.invalidate_dependents(name)
+        self.values[name] = value
+
+    def invalidate(self, name: str) -> None:
+        """
+        Drop a computed node and everything downstream of it. Inputs keep their
+        values.
+        """
+        if name in self.computations:
+            self.values.pop(name, None)
+        self.invalidate_dependents(name)
+
+    def invalidate_dependents(self, name: str) -> None:
+        stack = list(self.dependents.get(name, ()))
+        while stack:
+            node = stack.pop()
+            if self.values.pop(node, None) is not None:
+                logger.debug(f"invalidated {node}")
+            stack.extend(self.dependents.get(node, ()))
+
+
+class Stage:
+    """
+    An attribute backed by a node of the owner's `graph`.
+
+    Setting the attribute sets the node. Reading it computes the node when the
+    owner is `lazy`, otherwise it returns whatever was last computed or
+    `default()` when nothing has been.
+    """
+
+    def __init__(self, default: typing.Callable[[], typing.Any] = lambda: None):
+        self.default = default
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        if obj.lazy:
+            return obj.graph.get(self.name)
+        if obj.graph.is_computed(self.name):
+            return obj.graph.peek(self.name)
+        return self.default()
+
+    def __set__(self, obj, value):
+        obj.graph.set(self.name, value)
@@ -0,0 +1,139 @@
+import re
+import typing
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_HORIZONS = ["1M", "3M", "YTD", "1Y", "3Y", "5Y", "SI"]
+DAYS_PER_YEAR = 365.25
+
+HORIZON_PATTERN = re.compile(r"^(\d+)([DWMY])$")
+OFFSETS = {
+    "D": lambda n: pd.DateOffset(days=n),
+    "W": lambda n: pd.DateOffset(weeks=n),
+    "M": lambda n: pd.DateOffset(months=n),
+    "Y": lambda n: pd.DateOffset(years=n),
+}
+COLUMN_NAMES = {
+    "portfolio_returns": "portfolio",
+    "benchmark_returns": "benchmark",
+    "excess_returns": "excess",
+}
+
+
+class InvalidHorizon(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+
+
+def horizon_start(
+    as_of: pd.Timestamp, horizon: str, inception: pd.Timestamp
+) -> pd.Timestamp:
+    """
+    The date a horizon is measured from. Returns after this date and up to
+    `as_of` fall in the horizon.
+
+    Horizons are "YTD", "SI" (since inception) or a count of days, weeks,
+    months or years such as "10D", "6W", "3M" or "5Y".
+    """
+    horizon = horizon.upper()
+    if horizon == "SI":
+        return inception - pd.Timedelta(days=1)
+    if horizon == "YTD":
+        return pd.Timestamp(year=as_of.year - 1, month=12, day=31)
+    match = HORIZON_PATTERN.match(horizon)
+    if match is None:
+        raise InvalidHorizon(f"{horizon} is not a valid horizon")
+    count, unit = match.groups()
+    return as_of - OFFSETS[unit](int(count))
+
+
+def year_fraction(start: pd.Timestamp, end: pd.Timestamp) -> float:
+    """
+    Years from `start` to `end`: whole calendar years plus the remaining days
+    over `DAYS_PER_YEAR`, so a horizon of one year is exactly one.
+    """
+    years = end.year - start.year
+    if start + pd.DateOffset(years=years) > end:
+        years -= 1
+    anchor = start + pd.DateOffset(years=years)
+    return years + (end - anchor).days / DAYS_PER_YEAR
+
+
+def cumulative_wealth(returns: pd.DataFrame) -> pd.DataFrame:
+    """
+    Growth of one unit of capital for each column of returns. When both
+    portfolio and benchmark returns are present an `excess_returns` column
+    compounds their daily difference.
+    """
+    returns = returns.fillna(0)
+    if {"portfolio_returns", "benchmark_returns"} <= set(returns.columns):
+        returns = returns.assign(
+            excess_returns=returns.portfolio_returns - returns.benchmark_returns
+        )
+    return (1 + returns).cumprod()
+
+
+def window_returns(
+    wealth: pd.DataFrame, start: pd.Timestamp, end: pd.Timestamp
+) -> pd.DataFrame:
+    """
+    Cumulative returns through the window after `start` up to `end`, read
+    from precomputed wealth rather than compounding the window again.
+    """
+    first, last = wealth.index.searchsorted([start, end], side="right")
+    base = wealth.iloc[first - 1] if first > 0 else 1
+    return wealth.iloc[first:last] / base - 1
+
+
+def horizon_returns(
+    wealth: pd.DataFrame,
+    as_of: pd.Timestamp = None,
+    horizons: typing.List[str] = None,
+) -> pd.DataFrame:
+    """
+    Cumulative and annualised returns over every horizon up to `as_of`,
+    defaulting to the last date of the data.
+
+    Every horizon is found with a single `searchsorted` into the dates of the
+    precomputed wealth, so adding horizons costs almost nothing. Horizons that
+    start before the data are missing, apart from since inception. `excess`
+    compounds the daily difference of portfolio and benchmark returns, as in
+    `benchmark_analysis`, and returns are only annualised over horizons of a
+    year or more.
+
+    :returns: Pandas dataframe with a row per horizon
+    :rtype: pd.DataFrame
+    """
+    horizons = DEFAULT_HORIZONS if horizons is None else horizons
+    index = wealth.index
+    as_of = index[-1] if as_of is None else pd.Timestamp(as_of)
+    starts = pd.DatetimeIndex(
+        [horizon_start(as_of, horizon, index[0]) for horizon in horizons]
+    )
+    end = index.searchsorted(as_of, side="right")
+    first = index.searchsorted(starts, side="right")
+    since_inception = np.array([horizon.upper() == "SI" for horizon in horizons])
+    available = ((first > 0) | since_inception) & (end > 0)
+
+    padded = np.vstack([np.ones((1, wealth.shape[1])), wealth.to_numpy(dtype=float)])
+    cumulative = padded[end] / padded[first] - 1
+    cumulative[~available] = np.nan
+
+    result = pd.DataFrame(
+        cumulative, index=pd.Index(horizons, name="horizon"), columns=wealth.columns
+    )
+    result = result.rename(columns=COLUMN_NAMES)
+
+    period_start = index[np.clip(first - 1, 0, None)]
+    years = np.array([year_fraction(start, as_of) for start in starts])
+    for column in ["portfolio", "benchmark"]:
+        if column in result:
+            annualised = (1 + result[column]) ** (1 / np.maximum(years, 1)) - 1
+            result[f"{column}_annualised"] = np.where(
+                years >= 1, annualised, result[column]
+            )
+    result.insert(0, "start", pd.Series(period_start, index=result.index))
+    result.loc[~available, "start"] = pd.NaT
+    result.insert(1, "end", as_of)
+    return result
@@ -0,0 +1,300 @@
+import os
+import typing
+from datetime import datetime
+
+import pandas as pd
+
+from invest_tools import validation
+from invest_tools.log import logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:  # pragma: no cover
+    pa = None
+    ds = None
+
+PRICES_DATATYPES = {
+    "TIDM": "string",
+    "Date": "string",
+    "Open": float,
+    "High": float,
+    "Low": float,
+    "Close": float,
+    "Volume": float,
+    "Adjustment": float,
+}
+
+BENCHMARK_DATATYPES = {
+    "Date": "string",
+    "Open": float,
+    "High": float,
+    "Low": float,
+    "Close": float,
+    "Volume": float,
+    "Adjustment": float,
+}
+
+CURRENCY_DATATYPES = {
+    "Date": "string",
+    "Open": float,
+    "High": float,
+    "Low": float,
+    "Close": float,
+    "Adj Close": float,
+    "Volume": float,
+}
+
+PRICES_COLUMNS = ["TIDM", "Date", "Close", "Adjustment"]
+BENCHMARK_COLUMNS = ["Date", "Close"]
+CURRENCY_COLUMNS = ["Date", "Close"]
+
+PARQUET_SUFFIXES = (".parquet", ".pq")
+IPC_SUFFIXES = (".arrow", ".feather", ".ipc")
+
+# Times of day that may follow the date in CSV dates, tried in order
+TIME_FORMATS = ("", " %H:%M", " %H:%M:%S")
+
+Source = typing.Any
+
+
+class MissingDependency(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+
+
+def is_arrow_source(source: Source) -> bool:
+    """
+    Whether a source should be read with Arrow: an in-memory Arrow table or
+    dataset, a Parquet or Arrow IPC file, or a directory of them.
+    """
+    if pa is not None and isinstance(source, (pa.Table, pa.RecordBatch, ds.Dataset)):
+        return True
+    if isinstance(source, (str, os.PathLike)):
+        suffix = str(source).lower().endswith(PARQUET_SUFFIXES + IPC_SUFFIXES)
+        return suffix or os.path.isdir(source)
+    return False
+
+
+def _dataset(source: Source) -> "ds.Dataset":
+    if pa is None:
+        raise MissingDependency(
+            "pyarrow is needed to read Parquet and Arrow data, "
+            "install it with `pip install invest-tools[arrow]`"
+        )
+    if isinstance(source, ds.Dataset):
+        return source
+    if isinstance(source, pa.RecordBatch):
+        source = pa.Table.from_batches([source])
+    if isinstance(source, pa.Table):
+        return ds.dataset(source)
+    file_format = "ipc" if str(source).lower().endswith(IPC_SUFFIXES) else "parquet"
+    return ds.dataset(source, format=file_format, partitioning="hive")
+
+
+def _date_scalar(value: datetime, arrow_type: "pa.DataType") -> "pa.Scalar":
+    value = pd.Timestamp(value)
+    if pa.types.is_date(arrow_type):
+        return pa.scalar(value.date(), type=arrow_type)
+    if pa.types.is_timestamp(arrow_type) and arrow_type.tz is not None:
+        value = value.tz_localize(arrow_type.tz) if value.tz is None else value
+    return pa.scalar(value.to_pydatetime(), type=arrow_type)
+
+
+def read_arrow(
+    source: Source,
+    column_types: typing.Dict[str, str],
+    columns: typing.List[str],
+    codes: typing.List[str] = None,
+    start: datetime = None,
+    end: datetime = None,
+) -> pd.DataFrame:
+    """
+    Read only `columns` from an Arrow source after validating its schema.
+
+    A `codes` filter on TIDM is pushed down to the reader, as are `start` and
+    `end` dates when the Date column is stored as a date or timestamp, so
+    unused row groups and partitions are never read. Dates stored as strings
+    are filtered after parsing instead.
+
+    :returns: Pandas dataframe of the projected columns
+    :rtype: pd.DataFrame
+    """
+    dataset = _dataset(source)
+    valid = validation.validate_schema(dataset.schema, column_types)
+    logger.debug(f"passed validation: {valid}")
+    date_type = dataset.schema.field("Date").type
+    expression = None
+    filters = []
+    if codes is not None:
+        filters.append(ds.field("TIDM").isin(list(codes)))
+    if pa.types.is_temporal(date_type):
+        if start is not None:
+            filters.append(ds.field("Date") >= _date_scalar(start, date_type))
+        if end is not None:
+            filters.append(ds.field("Date") <= _date_scalar(end, date_type))
+    for f in filters:
+        expression = f if expression is None else expression & f
+    table = dataset.to_table(columns=columns, filter=expression)
+    df = table.to_pandas()
+    if "TIDM" in df:
+        df["TIDM"] = df["TIDM"].astype(str)
+    return df
+
+
+def _filter(
+    df: pd.DataFrame,
+    codes: typing.List[str] = None,
+    start: datetime = None,
+    end: datetime = None,
+) -> pd.DataFrame:
+    if codes is not None:
+        df = df.loc[df.TIDM.isin(list(codes))]
+    if start is not None:
+        df = df.loc[df.Date >= pd.Timestamp(start)]
+    if end is not None:
+        df = df.loc[df.Date <= pd.Timestamp(end)]
+    return df
+
+
+def _parse_dates(dates: pd.Series, date_format: str = None) -> pd.Series:
+    """
+    Parse string dates with `date_format`, allowing a time of day after the
+    date so intraday data can be loaded from CSV. Timezone aware dates keep
+    their local time without the zone, so they line up with naive dates.
+    """
+    if isinstance(dates.dtype, pd.DatetimeTZDtype):
+        return dates.dt.tz_localize(None)
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates
+    if not isinstance(dates.iloc[0], str) or date_format is None:
+        return pd.to_datetime(dates)
+    for time_format in TIME_FORMATS[:-1]:
+        try:
+            return pd.to_datetime(dates, format=date_format + time_format)
+        except ValueError:
+            pass
+    return pd.to_datetime(dates, format=date_format + TIME_FORMATS[-1])
+
+
+def _read(
+    source: Source,
+    column_types: typing.Dict[str, str],
+    columns: typing.List[str],
+    date_format: str = None,
+    codes: typing.List[str] = None,
+    start: datetime = None,
+    end: datetime = None,
+) -> pd.DataFrame:
+    if is_arrow_source(source):
+        logger.info("Loading data from Arrow source")
+        df = read_arrow(source, column_types, columns, codes, start, end)
+    else:
+        logger.info(f"Loading data from {source}")
+        df = pd.read_csv(source)
+        valid = validation.validate_columns(df, column_types.keys())
+        valid = validation.validate_datatypes(df, column_types)
+        logger.debug(f"passed validation: {valid}")
+    if len(df) > 0:
+        df["Date"] = _parse_dates(df["Date"], date_format)
+    return _filter(df, codes, start, end)
+
+
+def load_prices(
+    source: Source,
+    codes: typing.List[str] = None,
+    start: datetime = None,
+    end: datetime = None,
+) -> pd.DataFrame:
+    """
+    Load security prices from a CSV path or an Arrow source, optionally only
+    for the TIDM `codes` and dates between `start` and `end`.
+
+    Arrow sources are read with only the TIDM, Date, Close and Adjustment
+    columns.
+
+    :returns: Pandas dataframe of prices
+    :rtype: pd.DataFrame
+    """
+    return _read(
+        source, PRICES_DATATYPES, PRICES_COLUMNS, "%d/%m/%Y", codes, start, end
+    )
+
+
+def load_benchmark(
+    source: Source, start: datetime = None, end: datetime = None
+) -> pd.DataFrame:
+    """
+    Load benchmark prices and turn them into returns.
+
+    :returns: Pandas dataframe of `benchmark_returns` indexed by Date
+    :rtype: pd.DataFrame
+    """
+    df = _read(
+        source, BENCHMARK_DATATYPES, BENCHMARK_COLUMNS, "%d/%m/%Y", start=start, end=end
+    )
+    df = df.sort_values(by="Date")
+    df["returns"] = (df.Close / 100).pct_change()
+    df["benchmark_returns"] = df.returns.dropna()
+    df = df.set_index("Date")
+    return df[["benchmark_returns"]]
+
+
+def load_usd_converter(
+    source: Source, start: datetime = None, end: datetime = None
+) -> pd.DataFrame:
+    """
+    Load currency prices as a `Convert` rate indexed by Date.
+
+    :returns: Pandas dataframe of currency prices
+    :rtype: pd.DataFrame
+    """
+    cur = _read(source, CURRENCY_DATATYPES, CURRENCY_COLUMNS, start=start, end=end)
+    cur = cur.set_index("Date")
+    cur = cur.rename({"Close": "Convert"}, axis=1)
+    return cur[["Convert"]]
+
+
+def load_factors(
+    source: Source,
+    start: datetime = None,
+    end: datetime = None,
+    date_format: str = "%d/%m/%Y",
+) -> pd.DataFrame:
+    """
+    Load factor returns, such as market, size, value and momentum, as a Date
+    column and one column of decimal returns per factor.
+
+    :returns: Pandas dataframe of factor returns indexed by Date
+    :rtype: pd.DataFrame
+    """
+    if is_arrow_source(source):
+        logger.info("Loading factors from Arrow source")
+        df = _dataset(source).to_table().to_pandas()
+    else:
+        logger.info(f"Loading factors from {source}")
+        df = pd.read_csv(source)
+    if "Date" not in df:
+        raise validation.InvalidDataFrame("Invalid DataFrame, factors need a Date")
+    if len(df) > 0:
+        df["Date"] = _parse_dates(df["Date"], date_format)
+    df = _filter(df, start=start, end=end)
+    return df.sort_values(by="Date").set_index("Date").astype(float)
+
+
+def load_market_data(
+    prices: Source, fx: Source, benchmark: Source = None
+) -> typing.Dict[str, pd.DataFrame]:
+    """
+    Load the prices, FX rates and optional benchmark shared by many portfolios.
+
+    :returns: Dictionary of the loaded frames keyed by the `Portfolio`
+    attribute each one is assigned to
+    """
+    market_data = {
+        "prices": load_prices(prices),
+        "gbpusd": load_usd_converter(fx),
+    }
+    if benchmark is not None:
+        market_data["benchmark_returns"] = load_benchmark(benchmark)
+    return market_data
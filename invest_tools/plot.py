@@ -4,6 +4,8 @@ import seaborn as sns
 
 plt.style.use("fivethirtyeight")
 
+ANNOTATION_LIMIT = 20
+
 
 def plot_histogram(
     returns: pd.Series,
@@ -26,15 +28,35 @@ def plot_histogram(
 
 
 def plot_heatmap(
-    matrix: pd.DataFrame, plot_title: str, save: bool = False, save_location: str = None
+    matrix: pd.DataFrame,
+    plot_title: str,
+    save: bool = False,
+    save_location: str = None,
+    annotate: bool = None,
 ) -> None:
-    sns.heatmap(
-        matrix,
-        annot=True,
-        cmap="YlGnBu",
-        linewidth=0.3,
-        annot_kws={"size": 9},
-    )
+    """
+    Plot a heatmap of a matrix. Cell annotations are dropped once the matrix is
+    larger than `ANNOTATION_LIMIT` unless `annotate` is given explicitly.
+    """
+    if annotate is None:
+        annotate = len(matrix) <= ANNOTATION_LIMIT
+    if annotate:
+        sns.heatmap(
+            matrix,
+            annot=True,
+            cmap="YlGnBu",
+            linewidth=0.3,
+            annot_kws={"size": 9},
+        )
+    else:
+        sns.heatmap(
+            matrix,
+            annot=False,
+            cmap="YlGnBu",
+            xticklabels=len(matrix) <= ANNOTATION_LIMIT * 5,
+            yticklabels=len(matrix) <= ANNOTATION_LIMIT * 5,
+            rasterized=True,
+        )
     plt.xticks(rotation=90)
     plt.yticks(rotation=0)
     plt.title(plot_title)
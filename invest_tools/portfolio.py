@@ -1,42 +1,34 @@
 import typing
-from datetime import datetime, timedelta
+from datetime import datetime
 
+import numpy as np
 import pandas as pd
 
-from invest_tools import analysis, currency, plot, report, validation
+from invest_tools import (
+    analysis,
+    cache,
+    correlation,
+    currency,
+    drawdown,
+    factors,
+    graph,
+    horizons,
+    loaders,
+    plot,
+    rebalance,
+    report,
+    resample,
+    risk,
+    scenarios,
+    validation,
+)
+from invest_tools.loaders import (  # noqa: F401
+    BENCHMARK_DATATYPES,
+    CURRENCY_DATATYPES,
+    PRICES_DATATYPES,
+)
 from invest_tools.log import logger
 
-PRICES_DATATYPES = {
-    "TIDM": "string",
-    "Date": "string",
-    "Open": float,
-    "High": float,
-    "Low": float,
-    "Close": float,
-    "Volume": float,
-    "Adjustment": float,
-}
-
-BENCHMARK_DATATYPES = {
-    "Date": "string",
-    "Open": float,
-    "High": float,
-    "Low": float,
-    "Close": float,
-    "Volume": float,
-    "Adjustment": float,
-}
-
-CURRENCY_DATATYPES = {
-    "Date": "string",
-    "Open": float,
-    "High": float,
-    "Low": float,
-    "Close": float,
-    "Adj Close": float,
-    "Volume": float,
-}
-
 
 class Portfolio:
     """
@@ -49,12 +41,43 @@ class Portfolio:
     The main function of building the portfolio is to standardise the portfolio
     to a single currency using a conversion rate (the Close price of the
     relevant currency on the day of the returns).
+
+    The loaded data and every result are nodes of a small dependency graph.
+    Setting one of them, directly or through a `get_*` loader, drops only the
+    results that depend on it.
     """
 
+    portfolio_definition = graph.Stage(dict)
+    prices = graph.Stage(pd.DataFrame)
+    gbpusd = graph.Stage(pd.DataFrame)
+    usdgbp = graph.Stage(pd.DataFrame)
+    benchmark_returns = graph.Stage(pd.DataFrame)
+    frequency = graph.Stage()
+    resampled_prices = graph.Stage(pd.DataFrame)
+    resampled_gbpusd = graph.Stage(pd.DataFrame)
+    resampled_usdgbp = graph.Stage(pd.DataFrame)
+    resampled_benchmark = graph.Stage(pd.DataFrame)
+    factor_returns = graph.Stage(pd.DataFrame)
+    resampled_factors = graph.Stage(pd.DataFrame)
+    rebalancing = graph.Stage()
+    asset_returns = graph.Stage(pd.DataFrame)
+    rebalanced = graph.Stage(pd.DataFrame)
+    returns = graph.Stage(pd.DataFrame)
+    backtest = graph.Stage(pd.DataFrame)
+    clean_returns = graph.Stage(lambda: pd.Series(dtype=float))
+    percentage_returns = graph.Stage(lambda: pd.Series(dtype=float))
+    metrics = graph.Stage()
+    analysis = graph.Stage(dict)
+    wealth = graph.Stage(pd.DataFrame)
+    benchmark_window = graph.Stage()
+    benchmark = graph.Stage(pd.DataFrame)
+
     def __init__(
         self,
         portfolio_definition: typing.Dict[str, typing.Dict[str, str]],
         currency: currency.Currency,
+        result_cache: cache.ResultCache = None,
+        lazy: bool = False,
     ):
         """
         The portfolio definition must be a python dictionary with the form of:
@@ -73,60 +96,230 @@ class Portfolio:
 
         The currency is defined in the `Currency` enum.
 
+        Results of `analyse`, `benchmark_analysis` and the correlation matrix
+        are memoised in `result_cache`. Pass a shared `ResultCache`, optionally
+        backed by a directory on disk, to reuse results across portfolios.
+
+        When `lazy` is set, `backtest`, `clean_returns`, `analysis` and
+        `benchmark` are computed the first time they are read, running only
+        the stages they need, so the data can be loaded in any order and
+        `build`, `analyse` and `benchmark_analysis` need not be called.
+
         Other values are simply empty initialised for future use.
         """
         validation.validate_portfolio_definition(portfolio_definition)
         logger.info("validated portfolio definition")
+        self.lazy = lazy
+        self.graph = graph.DependencyGraph()
+        for name in ["portfolio_definition", "prices", "gbpusd", "usdgbp"]:
+            self.graph.add_input(name)
+        self.graph.add_input("benchmark_returns", pd.DataFrame())
+        self.graph.add_input("factor_returns", pd.DataFrame())
+        self.graph.add_input("metrics")
+        self.graph.add_input("frequency")
+        self.graph.add_input("rebalancing")
+        self.graph.add_input("benchmark_window")
+        for name, source, resample_data in [
+            ("resampled_prices", "prices", resample.resample_prices),
+            ("resampled_gbpusd", "gbpusd", resample.resample_levels),
+            ("resampled_usdgbp", "usdgbp", resample.resample_levels),
+            ("resampled_benchmark", "benchmark_returns", resample.resample_returns),
+            ("resampled_factors", "factor_returns", resample.resample_returns),
+        ]:
+            self.graph.add_node(
+                name,
+                self._resampler(source, resample_data),
+                [source, "frequency"],
+            )
+        self.graph.add_node(
+            "asset_returns",
+            self._build_asset_returns,
+            [
+                "portfolio_definition",
+                "resampled_prices",
+                "resampled_gbpusd",
+                "resampled_usdgbp",
+            ],
+        )
+        self.graph.add_node(
+            "rebalanced",
+            self._rebalance,
+            ["portfolio_definition", "asset_returns", "rebalancing"],
+        )
+        self.graph.add_node(
+            "returns", self._build_returns, ["asset_returns", "rebalanced"]
+        )
+        self.graph.add_node(
+            "backtest", self._build_backtest, ["returns", "resampled_benchmark"]
+        )
+        self.graph.add_node(
+            "clean_returns",
+            lambda: self.returns["portfolio_returns"].dropna(),
+            ["returns"],
+        )
+        self.graph.add_node(
+            "percentage_returns",
+            lambda: analysis.calculate_percentage_returns(self.clean_returns),
+            ["clean_returns"],
+        )
+        self.graph.add_node(
+            "analysis",
+            self._evaluate_analysis,
+            ["clean_returns", "backtest", "metrics", "frequency"],
+        )
+        self.graph.add_node(
+            "wealth",
+            lambda: horizons.cumulative_wealth(
+                self.backtest.filter(["portfolio_returns", "benchmark_returns"])
+            ),
+            ["backtest"],
+        )
+        self.graph.add_node(
+            "benchmark", self._evaluate_benchmark, ["wealth", "benchmark_window"]
+        )
         self.portfolio_definition = portfolio_definition
-        self.backtest = pd.DataFrame()
         self.prices = pd.DataFrame()
         self.gbpusd = pd.DataFrame()
         self.usdgbp = pd.DataFrame()
-        self.benchmark = pd.DataFrame()
+        self.metrics = None
+        self.frequency = None
+        self.rebalancing = None
+        self.benchmark_window = {"as_of": None, "window": "1Y"}
         self.currency = currency
-        self.clean_returns = pd.Series(dtype=float)
-        self.percentage_returns = pd.Series(dtype=float)
-        self.analysis = {}
+        self.correlation = pd.DataFrame()
+        self.covariance = pd.DataFrame()
+        self.cache = result_cache if result_cache is not None else cache.ResultCache()
+
+    def resample(self, frequency: str = None) -> None:
+        """
+        Reduce the loaded prices, conversion rates, benchmark and factors to
+        daily ("D"), weekly ("W"), monthly ("M"), quarterly ("Q") or annual
+        ("A") periods before the portfolio is built, or keep them as loaded
+        when `frequency` is None.
+
+        Annualised metrics use this frequency, or the one inferred from the
+        dates of the returns when the data is kept as loaded.
+        """
+        if frequency is not None and frequency not in resample.PERIODS_PER_YEAR:
+            raise resample.InvalidFrequency(
+                f"{frequency} is not one of {list(resample.PERIODS_PER_YEAR)}"
+            )
+        if frequency != self.frequency:
+            self.frequency = frequency
 
     def ping(self):
         logger.info("PING")
         return "pong"
 
-    def build(self) -> pd.DataFrame:
+    def build(
+        self,
+        rebalance: str = None,
+        threshold: float = None,
+        transaction_cost: float = 0.0,
+    ) -> pd.DataFrame:
         """
         Use the portfolio definition to build the portfolio
 
+        By default the portfolio is held at its target weights every day. Pass
+        a calendar `rebalance` frequency ("D", "W", "M", "Q" or "A"), a drift
+        `threshold` or both to let the weights drift between rebalances, with
+        `transaction_cost` charged per unit of turnover. The turnover and costs
+        are kept on `rebalanced`.
+
         :returns: Pandas dataframe of the portfolio returns
         :rtype: pd.DataFrame
         """
+        rebalancing = None
+        if rebalance is not None or threshold is not None:
+            rebalancing = {
+                "frequency": rebalance,
+                "threshold": threshold,
+                "transaction_cost": transaction_cost,
+            }
+        if rebalancing != self.rebalancing:
+            self.rebalancing = rebalancing
+        backtest = self.graph.get("backtest")
+        self.graph.get("clean_returns")
+        logger.info("Portfolio built")
+        return backtest
+
+    def _build_asset_returns(self) -> pd.DataFrame:
+        if len(self.prices) < 1:
+            raise graph.MissingInput("prices have not been loaded, run `.get_prices()`")
+        definition = self.portfolio_definition
+        foreign = {
+            code
+            for code, opts in definition.items()
+            if opts["currency"] != self.currency.value
+        }
+        rates = self._conversion_rates() if foreign else None
         dfs = []
-        weights = []
-        for code, opts in self.portfolio_definition.items():
-            weights.append(opts["weight"])
-            if opts["currency"] != self.currency:
-                if opts["currency"] != currency.Currency.GBP:
-                    ret = self.calculate_returns(
-                        self.prices, code, convert=True, cur=self.gbpusd
-                    )
-                elif opts["currency"] != currency.Currency.USD:
-                    ret = self.calculate_returns(
-                        self.prices, code, convert=True, cur=self.usdgbp
-                    )
-            else:
-                ret = self.calculate_returns(
-                    self.prices, code, convert=False, cur=self.gbpusd
-                )
+        for code in definition:
+            ret = self.calculate_returns(
+                self.resampled_prices, code, convert=code in foreign, cur=rates
+            )
             ret = ret.rename({"Returns": code}, axis=1)
             dfs.append(ret[code].to_frame())
-        port = dfs[0].join(dfs[1:])
-        port_ret = port.mul(weights, axis=1).sum(axis=1)
-        port["portfolio_returns"] = port_ret
-        self.backtest = port
-        self.clean_returns = port_ret.dropna()
-        logger.info("Portfolio built")
+        return dfs[0].join(dfs[1:])
+
+    def _conversion_rates(self) -> pd.DataFrame:
+        """
+        `Convert` rates taking foreign prices into the portfolio currency: USD
+        to GBP for a GBP portfolio and GBP to USD for a USD one, taken as the
+        reciprocal of USD to GBP when those are not loaded.
+        """
+        rates = self.graph.get("resampled_gbpusd")
+        if self.currency == currency.Currency.USD:
+            usdgbp = self.graph.get("resampled_usdgbp")
+            rates = usdgbp if len(usdgbp) > 0 else 1 / rates
+        if len(rates) < 1:
+            raise graph.MissingInput(
+                "conversion rates have not been loaded, run `.get_usd_converter()`"
+            )
+        return rates
+
+    def _resampler(
+        self,
+        source: str,
+        resample_data: typing.Callable[[pd.DataFrame, str], pd.DataFrame],
+    ) -> typing.Callable[[], pd.DataFrame]:
+        def compute() -> pd.DataFrame:
+            data = self.graph.get(source)
+            if self.frequency is None:
+                return data
+            return resample_data(data, self.frequency)
+
+        return compute
+
+    def _rebalance(self) -> pd.DataFrame:
+        weights = [opts["weight"] for opts in self.portfolio_definition.values()]
+        if self.rebalancing is None:
+            port_ret = self.asset_returns.mul(weights, axis=1).sum(axis=1)
+            return pd.DataFrame(
+                {
+                    "portfolio_returns": port_ret,
+                    "turnover": 0.0,
+                    "transaction_costs": 0.0,
+                }
+            )
+        return rebalance.backtest_rebalanced(
+            self.asset_returns, weights, **self.rebalancing
+        )
+
+    def _build_returns(self) -> pd.DataFrame:
+        port = self.asset_returns.copy()
+        port["portfolio_returns"] = self.rebalanced["portfolio_returns"]
+        self.cache.invalidate(self._dependency("backtest"))
         return port
 
-    def get_prices(self, prices_csv: str) -> pd.DataFrame:
+    def _build_backtest(self) -> pd.DataFrame:
+        if len(self.resampled_benchmark) < 1:
+            return self.returns
+        return self.returns.join(self.resampled_benchmark)
+
+    def get_prices(
+        self, prices_csv: loaders.Source, start: datetime = None, end: datetime = None
+    ) -> pd.DataFrame:
         """
         Take in a string pointing to a csv file containing the prices
 
@@ -137,19 +330,26 @@ class Portfolio:
 
         The Date column should be in the format of "%d/%m/%Y".
 
+        Parquet or Arrow IPC files, partitioned directories of them and
+        in-memory Arrow tables are also accepted. Only the TIDM, Date, Close
+        and Adjustment columns of the portfolio's codes are read from these,
+        and dates between `start` and `end` when Date is stored as a date.
+
         :returns: Pandas dataframe of the portfolio prices
         :rtype: pd.DataFrame
         """
-        logger.info(f"Loading data from {prices_csv}")
-        df = pd.read_csv(prices_csv)
-        valid = validation.validate_columns(df, PRICES_DATATYPES.keys())
-        valid = validation.validate_datatypes(df, PRICES_DATATYPES)
-        logger.debug(f"passed validation: {valid}")
-        df["Date"] = pd.to_datetime(df["Date"], format="%d/%m/%Y")
+        df = loaders.load_prices(
+            prices_csv, codes=list(self.portfolio_definition), start=start, end=end
+        )
         self.prices = df
         return df
 
-    def get_benchmark(self, benchmark_csv: str) -> pd.Series:
+    def get_benchmark(
+        self,
+        benchmark_csv: loaders.Source,
+        start: datetime = None,
+        end: datetime = None,
+    ) -> pd.Series:
         """
         Take in a string pointing to a csv file containing an appropriate benchmark
 
@@ -160,24 +360,25 @@ class Portfolio:
 
         The Date column should be in the format of "%d/%m/%Y".
 
+        Arrow sources are accepted as for `get_prices`.
+
         :returns: Pandas dataframe of the portfolio benchmark
         :rtype: pd.DataFrame
         """
-        logger.info(f"Loading data from {benchmark_csv}")
-        df = pd.read_csv(benchmark_csv)
-        valid = validation.validate_columns(df, BENCHMARK_DATATYPES.keys())
-        valid = validation.validate_datatypes(df, BENCHMARK_DATATYPES)
-        logger.debug(f"passed validation: {valid}")
-        df["Date"] = pd.to_datetime(df["Date"], format="%d/%m/%Y")
-        df["returns"] = (df.Close / 100).pct_change()
-        df["benchmark_returns"] = df.returns.dropna()
-        df = df.set_index("Date")
-        df = df[["benchmark_returns"]]
-        self.backtest = self.backtest.join(df)
+        df = loaders.load_benchmark(benchmark_csv, start=start, end=end)
+        self.benchmark_returns = df
+        self.cache.invalidate(self._dependency("benchmark"))
+        if not self.lazy and self.graph.is_computed("returns"):
+            self.graph.get("backtest")
         return df
 
     # TODO make this generic for currency
-    def get_usd_converter(self, conversion_csv: str) -> pd.DataFrame:
+    def get_usd_converter(
+        self,
+        conversion_csv: loaders.Source,
+        start: datetime = None,
+        end: datetime = None,
+    ) -> pd.DataFrame:
         """
         Get a dataframe of USD to GBP to convert the prices between currencies.
         All portfolio prices and returns should be in GBP.
@@ -187,21 +388,41 @@ class Portfolio:
         | Date | Open | High | Low | Close | Adj Close | Volume |
         |------|------|------|-----|-------|-----------|--------|
 
+        Arrow sources are accepted as for `get_prices`.
+
         :returns: Pandas dataframe of currency prices.
         :rtype: pd.DataFrame
         """
-        logger.info(f"Loading data from {conversion_csv}")
-        cur = pd.read_csv(conversion_csv)
-        valid = validation.validate_columns(cur, CURRENCY_DATATYPES.keys())
-        valid = validation.validate_datatypes(cur, CURRENCY_DATATYPES)
-        logger.debug(f"passed validation: {valid}")
-        cur["Date"] = pd.to_datetime(cur["Date"])
-        cur = cur.set_index("Date")
-        cur = cur.rename({"Close": "Convert"}, axis=1)
-        cur = cur[["Convert"]]
+        cur = loaders.load_usd_converter(conversion_csv, start=start, end=end)
         self.gbpusd = cur
         return cur
 
+    def get_factors(
+        self,
+        factors_csv: loaders.Source,
+        start: datetime = None,
+        end: datetime = None,
+        date_format: str = "%d/%m/%Y",
+    ) -> pd.DataFrame:
+        """
+        Load factor returns to regress the portfolio on, such as market, size,
+        value and momentum.
+
+        The CSV should have a Date column and a column of decimal returns for
+        every factor:
+
+        | Date | market | size | value | ... |
+        |------|--------|------|-------|-----|
+
+        Arrow sources are accepted as for `get_prices`.
+
+        :returns: Pandas dataframe of factor returns
+        :rtype: pd.DataFrame
+        """
+        df = loaders.load_factors(factors_csv, start, end, date_format)
+        self.factor_returns = df
+        return df
+
     def calculate_returns(
         self, prices: pd.DataFrame, code: str, convert: bool, cur: pd.DataFrame
     ) -> pd.DataFrame:
@@ -236,62 +457,310 @@ class Portfolio:
         logger.info(f"Calculation for {code} finished")
         return ti
 
-    def analyse(self) -> typing.Dict[str, float]:
-        analysis_results = {}
-
-        daily_returns = analysis.calculate_mean_daily_returns(self.clean_returns)
-        annual_returns = analysis.calculate_mean_annual_return(self.clean_returns)
-        daily_std = analysis.calculate_std_daily(self.clean_returns)
-        daily_var = analysis.calculate_variance_daily(self.clean_returns)
-        skew = analysis.calculate_skewness(self.clean_returns)
-        kurtosis = analysis.calculate_kurtosis(self.clean_returns)
-        cov_beta = analysis.calculate_beta_cov(self.backtest)
-        capm_beta = analysis.calculate_beta_capm(self.backtest)
-        max_drawdown = analysis.calculate_max_drawdown(self.clean_returns)
-
-        analysis_results["daily_returns"] = daily_returns
-        analysis_results["annual_returns"] = annual_returns
-        analysis_results["daily_std"] = daily_std
-        analysis_results["daily_var"] = daily_var
-        analysis_results["skew"] = skew
-        analysis_results["kurtosis"] = kurtosis
-        analysis_results["beta_covariance"] = cov_beta
-        analysis_results["beta_capm"] = capm_beta
-        analysis_results["max_drawdown"] = max_drawdown
+    def _dependency(self, name: str) -> str:
+        return f"{name}:{id(self)}"
+
+    def analyse(self, metrics: typing.List[str] = None) -> typing.Dict[str, float]:
+        """
+        Calculate the summary metrics of the portfolio returns. Results are
+        reused while the backtest is unchanged.
+
+        `metrics` picks which of the metrics registered in `analysis.METRICS`
+        to calculate, defaulting to `analysis.DEFAULT_METRICS`.
 
+        :returns: Dictionary of metric name to value
+        :rtype: typing.Dict[str, float]
+        """
+        if metrics != self.metrics:
+            self.metrics = metrics
+        self.graph.invalidate("analysis")
+        analysis_results = self.graph.get("analysis")
+        self.graph.get("percentage_returns")
+        return analysis_results
+
+    def _evaluate_analysis(self) -> typing.Dict[str, float]:
+        metrics = analysis.DEFAULT_METRICS if self.metrics is None else self.metrics
+        key = cache.make_key(
+            "analyse",
+            self.clean_returns,
+            self.backtest,
+            metrics=[analysis.metric_identity(m) for m in metrics],
+            frequency=self.frequency,
+        )
+        analysis_results = self.cache.get_or_compute(
+            key,
+            self._analyse,
+            depends_on=[self._dependency("backtest"), self._dependency("benchmark")],
+        )
+        analysis_results = dict(analysis_results)
         logger.info("Analysis loaded")
         logger.info(f"Analysis results: {analysis_results}")
-        self.analysis = analysis_results
-        self.percentage_returns = analysis.calculate_percentage_returns(
-            self.clean_returns
-        )
         return analysis_results
 
-    def benchmark_analysis(self) -> pd.DataFrame:
-        cumulative_returns = self.backtest[["portfolio_returns", "benchmark_returns"]]
-        cumulative_returns = cumulative_returns.loc[
-            datetime.now() - timedelta(days=365) : datetime.now()
-        ]
-        cumulative_returns = cumulative_returns.assign(
-            excess_returns=cumulative_returns.portfolio_returns
-            - cumulative_returns.benchmark_returns
-        )
-        cumulative_returns = (
-            1 + cumulative_returns[["portfolio_returns", "excess_returns"]]
-        ).cumprod() - 1
-        self.benchmark = cumulative_returns
-        return cumulative_returns
-
-    def plot_correlation_heatmap(self, save=False, save_location: str = None) -> None:
-        if len(self.backtest) < 1:
-            logger.warn("please run `.build()` before plotting")
-        stock_returns = self.backtest.drop(
-            columns=["portfolio_returns", "benchmark_returns"]
+    def _analyse(self) -> typing.Dict[str, float]:
+        periods_per_year = resample.periods_per_year(
+            self.frequency, self.clean_returns.index.to_series()
         )
-        correlation_matrix = stock_returns.corr()
+        return analysis.calculate_metrics(
+            self.clean_returns, self.backtest, self.metrics, periods_per_year
+        )
+
+    def benchmark_analysis(
+        self, as_of: datetime = None, window: str = "1Y"
+    ) -> pd.DataFrame:
+        """
+        Cumulative portfolio and excess returns over the `window` horizon
+        ending `as_of`, which defaults to the last date of the backtest.
+
+        :returns: Pandas dataframe of cumulative returns
+        :rtype: pd.DataFrame
+        """
+        benchmark_window = {"as_of": as_of, "window": window}
+        if benchmark_window != self.benchmark_window:
+            self.benchmark_window = benchmark_window
+        self.graph.invalidate("benchmark")
+        return self.graph.get("benchmark")
+
+    def _evaluate_benchmark(self) -> pd.DataFrame:
+        if "excess_returns" not in self.wealth:
+            raise graph.MissingInput(
+                "benchmark has not been loaded, run `.get_benchmark()`"
+            )
+        as_of, window = self.benchmark_window["as_of"], self.benchmark_window["window"]
+        as_of = self.wealth.index[-1] if as_of is None else pd.Timestamp(as_of)
+        start = horizons.horizon_start(as_of, window, self.wealth.index[0])
+        key = cache.make_key("benchmark_analysis", self.wealth, start=start, end=as_of)
+        return self.cache.get_or_compute(
+            key,
+            lambda: horizons.window_returns(
+                self.wealth[["portfolio_returns", "excess_returns"]], start, as_of
+            ),
+            depends_on=[self._dependency("backtest"), self._dependency("benchmark")],
+        )
+
+    def horizon_analysis(
+        self, as_of: datetime = None, horizon_list: typing.List[str] = None
+    ) -> pd.DataFrame:
+        """
+        Cumulative, excess and annualised returns of the portfolio and the
+        benchmark over several horizons ending `as_of`, by default
+        `horizons.DEFAULT_HORIZONS` up to the last date of the backtest.
+
+        :returns: Pandas dataframe with a row per horizon
+        :rtype: pd.DataFrame
+        """
+        wealth = self.graph.get("wealth")
+        key = cache.make_key("horizons", wealth, as_of=as_of, horizon_list=horizon_list)
+        return self.cache.get_or_compute(
+            key,
+            lambda: horizons.horizon_returns(wealth, as_of, horizon_list),
+            depends_on=[self._dependency("backtest"), self._dependency("benchmark")],
+        )
+
+    def drawdown_analysis(self, n: int = 5) -> pd.DataFrame:
+        """
+        The `n` deepest drawdown episodes of the portfolio with their peak,
+        trough and recovery dates and durations.
+
+        :returns: Pandas dataframe of drawdown episodes
+        :rtype: pd.DataFrame
+        """
+        clean_returns = self.graph.get("clean_returns")
+        key = cache.make_key("drawdown", clean_returns, n=n)
+        return self.cache.get_or_compute(
+            key,
+            lambda: drawdown.top_drawdowns(clean_returns, n),
+            depends_on=[self._dependency("backtest")],
+        )
+
+    def factor_analysis(self, window: int = None) -> pd.DataFrame:
+        """
+        Factor exposures of the portfolio and every holding, with their alpha,
+        R² and residual risk, over the whole backtest or every rolling
+        `window` of periods.
+
+        The factors are those loaded with `get_factors`, or the benchmark as a
+        single `market` factor when none have been loaded.
+
+        :returns: Pandas dataframe with a row per holding and the portfolio
+        :rtype: pd.DataFrame
+        """
+        backtest = self.graph.get("backtest")
+        factor_returns = self.graph.get("resampled_factors")
+        if len(factor_returns) < 1:
+            benchmark = self.graph.get("resampled_benchmark")
+            if len(benchmark) < 1:
+                raise graph.MissingInput(
+                    "no factors have been loaded, run `.get_factors()` "
+                    "or `.get_benchmark()`"
+                )
+            factor_returns = benchmark.rename(
+                columns={"benchmark_returns": factors.MARKET}
+            )
+        returns = backtest.drop(columns=["benchmark_returns"], errors="ignore")
+        key = cache.make_key("factors", returns, factor_returns, window=window)
+        return self.cache.get_or_compute(
+            key,
+            lambda: factors.factor_regression(returns, factor_returns, window),
+            depends_on=[self._dependency("backtest")],
+        )
+
+    def correlation_matrix(
+        self, dtype: typing.Type[np.floating] = np.float64
+    ) -> pd.DataFrame:
+        """
+        Correlation matrix of the security returns in the backtest.
+
+        The matrix is memoised in the result cache, keyed on the returns and
+        the dtype, and the latest one is kept on `correlation`.
+
+        :returns: Pandas dataframe of pairwise correlations
+        :rtype: pd.DataFrame
+        """
+        stock_returns = self.graph.get("backtest").drop(
+            columns=["portfolio_returns", "benchmark_returns"], errors="ignore"
+        )
+        key = cache.make_key("correlation", stock_returns, dtype=np.dtype(dtype).name)
         logger.info("calculating portfolio correlation")
+        self.correlation = self.cache.get_or_compute(
+            key,
+            lambda: correlation.calculate_correlation_matrix(
+                stock_returns, dtype=dtype
+            ),
+            depends_on=[self._dependency("backtest")],
+        )
+        return self.correlation
+
+    def covariance_matrix(
+        self, method: str = "sample", **params: typing.Any
+    ) -> pd.DataFrame:
+        """
+        Covariance matrix of the security returns in the backtest, estimated
+        with one of `risk.ESTIMATORS` ("sample", "ewma" or "ledoit_wolf") and
+        `params` such as the EWMA `decay`.
+
+        The matrix is memoised in the result cache, keyed on the returns, the
+        method and its parameters, and the latest one is kept on `covariance`.
+
+        :returns: Pandas dataframe of covariances
+        :rtype: pd.DataFrame
+        """
+        stock_returns = self.graph.get("backtest").drop(
+            columns=["portfolio_returns", "benchmark_returns"], errors="ignore"
+        )
+        key = cache.make_key("covariance", stock_returns, method=method, **params)
+        self.covariance = self.cache.get_or_compute(
+            key,
+            lambda: risk.estimate_covariance(stock_returns, method, **params),
+            depends_on=[self._dependency("backtest")],
+        )
+        return self.covariance
+
+    def risk_contributions(
+        self,
+        weights: typing.Union[pd.Series, pd.DataFrame] = None,
+        method: str = "sample",
+        **params: typing.Any,
+    ) -> pd.DataFrame:
+        """
+        Marginal, component and percentage contributions of each security to
+        the volatility of the portfolio's target weights, or of any `weights`
+        over its securities. Pass a dataframe of securities by portfolios to
+        attribute many sets of weights against the one cached covariance.
+
+        :returns: Pandas dataframe of risk contributions per security
+        :rtype: pd.DataFrame
+        """
+        if weights is None:
+            weights = pd.Series(
+                {
+                    code: opts["weight"]
+                    for code, opts in self.portfolio_definition.items()
+                }
+            )
+        return risk.risk_contributions(
+            self.covariance_matrix(method, **params), weights
+        )
+
+    def stress_test(
+        self,
+        scenario_list: typing.List[dict],
+        weights: typing.Union[pd.Series, pd.DataFrame] = None,
+    ) -> pd.DataFrame:
+        """
+        Return of the portfolio's target weights, or of any `weights` over its
+        securities, under each scenario. See `scenarios.scenario_shocks` for
+        the FX, currency, asset, market and historical replay shocks a
+        scenario can hold, for example:
+
+        ```
+            [
+                {"name": "GBP -15%", "fx": {"gbp": -0.15}},
+                {"name": "Equities -30%", "market": -0.3},
+                {"name": "2020", "start": "2020-02-19", "end": "2020-03-23"},
+            ]
+        ```
+
+        Historical windows are replayed from the resampled prices converted to
+        the portfolio currency with the same rates as the backtest.
+
+        :returns: Pandas dataframe with a row per scenario and a column per
+        set of weights
+        :rtype: pd.DataFrame
+        """
+        definition = self.portfolio_definition
+        currencies = pd.Series(
+            {code: opts["currency"] for code, opts in definition.items()}
+        )
+        if weights is None:
+            weights = pd.Series(
+                {code: opts["weight"] for code, opts in definition.items()},
+                name="portfolio",
+            )
+        values = None
+        if len(self.prices) > 0:
+            prices = scenarios.price_matrix(self.graph.get("resampled_prices"))
+            prices = prices.reindex(columns=currencies.index)
+            foreign = (currencies != self.currency.value).any()
+            rates = self._conversion_rates() if foreign else None
+            values = prices * scenarios.conversion_matrix(
+                prices.index, currencies, self.currency, rates
+            )
+        shocks = scenarios.scenario_shocks(
+            scenario_list, currencies, self.currency, values
+        )
+        return scenarios.evaluate_scenarios(shocks, weights)
+
+    def top_correlations(self, k: int = 10) -> pd.DataFrame:
+        """
+        The `k` most strongly correlated pairs of securities in the portfolio.
+
+        :returns: Pandas dataframe of `first`, `second` and `correlation`
+        :rtype: pd.DataFrame
+        """
+        return correlation.top_correlated_pairs(self.correlation_matrix(), k)
+
+    def plot_correlation_heatmap(
+        self, save=False, save_location: str = None, ordered: bool = None
+    ) -> None:
+        """
+        Plot the correlation matrix. Large portfolios are drawn in clustered
+        order without cell annotations.
+        """
+        if len(self.backtest) < 1:
+            logger.warn("please run `.build()` before plotting")
+        correlation_matrix = self.correlation_matrix()
+        large = len(correlation_matrix) > plot.ANNOTATION_LIMIT
+        if ordered is None:
+            ordered = large
+        if ordered:
+            correlation_matrix = correlation.order_matrix(correlation_matrix)
         plot.plot_heatmap(
-            correlation_matrix, "Portfolio Correlation", save, save_location
+            correlation_matrix,
+            "Portfolio Correlation",
+            save,
+            save_location,
+            annotate=not large,
         )
 
     def plot_returns_data(self, save=False, save_location: str = None) -> None:
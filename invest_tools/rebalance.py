@@ -0,0 +1,124 @@
+import typing
+
+import numpy as np
+import pandas as pd
+
+FREQUENCIES = ["D", "W", "M", "Q", "A"]
+LOOKAHEAD = 64
+
+
+class InvalidSchedule(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+
+
+def calendar_schedule(index: pd.DatetimeIndex, frequency: str = None) -> np.ndarray:
+    """
+    Mark the last period of every calendar `frequency` ("D", "W", "M", "Q" or
+    "A") as a rebalance date. Nothing is marked when `frequency` is None, and
+    never the final period as there is nothing left to trade.
+
+    :returns: Boolean array, True where the book is rebalanced after the close
+    :rtype: np.ndarray
+    """
+    schedule = np.zeros(len(index), dtype=bool)
+    if frequency is None or len(index) < 2:
+        return schedule
+    if frequency not in FREQUENCIES:
+        raise InvalidSchedule(f"{frequency} is not one of {FREQUENCIES}")
+    periods = pd.DatetimeIndex(index).to_period(frequency).asi8
+    schedule[:-1] = periods[1:] != periods[:-1]
+    return schedule
+
+
+def threshold_schedule(
+    growth: np.ndarray,
+    weights: np.ndarray,
+    threshold: float,
+    schedule: np.ndarray,
+) -> np.ndarray:
+    """
+    Add a rebalance wherever any weight drifts more than `threshold` from
+    target since the previous rebalance.
+
+    Drift depends on when the book was last rebalanced, so this steps from one
+    rebalance to the next. Each step looks ahead over a block of periods at
+    once, doubling the block until a breach is found.
+    """
+    schedule = schedule.copy()
+    n_periods = len(growth)
+    base = np.ones(growth.shape[1])
+    start = 0
+    while start < n_periods - 1:
+        scaled = weights / base
+        breach_at = None
+        stop, lookahead = start, LOOKAHEAD
+        while stop < n_periods - 1 and breach_at is None:
+            end = min(n_periods - 1, stop + lookahead)
+            holdings = growth[stop:end] * scaled
+            drift = holdings / holdings.sum(axis=1, keepdims=True)
+            breach = np.abs(drift - weights).max(axis=1) > threshold
+            breach |= schedule[stop:end]
+            if breach.any():
+                breach_at = stop + breach.argmax()
+            stop, lookahead = end, lookahead * 2
+        if breach_at is None:
+            break
+        schedule[breach_at] = True
+        base = growth[breach_at]
+        start = breach_at + 1
+    return schedule
+
+
+def backtest_rebalanced(
+    asset_returns: pd.DataFrame,
+    weights: typing.Sequence[float],
+    frequency: str = None,
+    threshold: float = None,
+    transaction_cost: float = 0.0,
+) -> pd.DataFrame:
+    """
+    Backtest a book that starts at the target `weights`, drifts with the asset
+    returns and is traded back to target on a calendar `frequency`, when a
+    weight drifts more than `threshold` from target, or both.
+
+    Holdings between rebalances are the target weights grown by the ratio of
+    cumulative asset growth to its value at the last rebalance, so every
+    period is calculated at once rather than stepping day by day. Missing
+    returns are treated as flat.
+
+    `turnover` is the sum of absolute weight changes traded at a rebalance and
+    `transaction_costs` is `transaction_cost` times turnover, charged against
+    that period's return.
+
+    :returns: Pandas dataframe of `portfolio_returns`, `turnover` and
+    `transaction_costs`
+    :rtype: pd.DataFrame
+    """
+    weights = np.asarray(weights, dtype=float)
+    growth = np.cumprod(1 + asset_returns.fillna(0).to_numpy(dtype=float), axis=0)
+    schedule = calendar_schedule(asset_returns.index, frequency)
+    if threshold is not None:
+        schedule = threshold_schedule(growth, weights, threshold, schedule)
+
+    positions = np.arange(len(growth))
+    previous = np.concatenate([[False], schedule[:-1]])
+    last_rebalance = np.maximum.accumulate(np.where(previous, positions - 1, -1))
+    padded = np.vstack([np.ones((1, growth.shape[1])), growth])
+    holdings = weights * growth / padded[last_rebalance + 1]
+    value = holdings.sum(axis=1)
+    previous_value = np.where(previous, 1, np.concatenate([[1], value[:-1]]))
+    previous_value[0] = 1
+
+    drift = holdings / value[:, None]
+    turnover = np.where(schedule, np.abs(drift - weights).sum(axis=1), 0.0)
+    costs = turnover * transaction_cost
+    portfolio_returns = (value / previous_value) * (1 - costs) - 1
+    return pd.DataFrame(
+        {
+            "portfolio_returns": portfolio_returns,
+            "turnover": turnover,
+            "transaction_costs": costs,
+        },
+        index=asset_returns.index,
+    )
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+from invest_tools.log import logger
+
+PERIODS_PER_YEAR = {"D": 252, "W": 52, "M": 12, "Q": 4, "A": 1}
+DEFAULT_FREQUENCY = "D"
+# Largest median gap in days between observations for each frequency
+MAX_GAP_DAYS = {"D": 4, "W": 10, "M": 45, "Q": 140}
+AGGREGATIONS = {
+    "Open": "first",
+    "High": "max",
+    "Low": "min",
+    "Close": "last",
+    "Adj Close": "last",
+    "Volume": "sum",
+    "Adjustment": "last",
+}
+
+
+class InvalidFrequency(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+
+
+def _validate(frequency: str) -> None:
+    if frequency not in PERIODS_PER_YEAR:
+        raise InvalidFrequency(f"{frequency} is not one of {list(PERIODS_PER_YEAR)}")
+
+
+def infer_frequency(dates: pd.Series) -> str:
+    """
+    Guess the frequency of observations from the median gap between distinct
+    dates, defaulting to daily when there are too few to tell.
+
+    Data more frequent than daily is reported as daily with a warning, as it
+    should be resampled before being annualised.
+
+    :returns: One of the keys of `PERIODS_PER_YEAR`
+    :rtype: str
+    """
+    dates = pd.DatetimeIndex(pd.unique(pd.Series(dates).dropna())).sort_values()
+    if len(dates) < 2:
+        return DEFAULT_FREQUENCY
+    gap = np.median(np.diff(dates.asi8)) / pd.Timedelta(days=1).value
+    if gap < 1:
+        logger.warning("data is more frequent than daily, resample it to daily")
+    for frequency, max_gap in MAX_GAP_DAYS.items():
+        if gap <= max_gap:
+            return frequency
+    return "A"
+
+
+def periods_per_year(frequency: str = None, dates: pd.Series = None) -> int:
+    """
+    Number of periods in a year at `frequency`, inferred from `dates` when no
+    frequency is given.
+    """
+    if frequency is None:
+        frequency = DEFAULT_FREQUENCY if dates is None else infer_frequency(dates)
+    _validate(frequency)
+    return PERIODS_PER_YEAR[frequency]
+
+
+def period_end(dates: pd.Series, frequency: str) -> pd.Series:
+    """
+    The last calendar day of the `frequency` period each date falls in.
+    """
+    _validate(frequency)
+    periods = pd.Series(dates).dt.to_period(frequency)
+    return periods.dt.end_time.dt.normalize()
+
+
+def resample_prices(prices: pd.DataFrame, frequency: str) -> pd.DataFrame:
+    """
+    Reduce long prices to one row per TIDM and `frequency` period, dated at
+    the end of the period so every security lines up.
+
+    Rows are sorted by Date once and each column reduced by a single grouped
+    aggregation: the last Close and Adjustment, the first Open, the highest
+    High, the lowest Low and the total Volume of the period.
+
+    :returns: Pandas dataframe of prices in the same columns
+    :rtype: pd.DataFrame
+    """
+    if len(prices) < 1:
+        return prices
+    prices = prices.sort_values(by="Date", kind="stable")
+    aggregations = {c: a for c, a in AGGREGATIONS.items() if c in prices}
+    resampled = prices.groupby(
+        [prices.TIDM, period_end(prices.Date, frequency).rename("Date")], sort=True
+    ).agg(aggregations)
+    return resampled.reset_index()[list(prices.columns)]
+
+
+def resample_levels(df: pd.DataFrame, frequency: str) -> pd.DataFrame:
+    """
+    Keep the last row of each `frequency` period of a Date indexed frame of
+    levels such as exchange rates, dated at the end of the period.
+
+    :returns: Pandas dataframe indexed by period end
+    :rtype: pd.DataFrame
+    """
+    if len(df) < 1:
+        return df
+    df = df.sort_index(kind="stable")
+    ends = period_end(df.index.to_series(), frequency)
+    keep = ~ends.duplicated(keep="last").to_numpy()
+    resampled = df.loc[keep]
+    resampled.index = pd.DatetimeIndex(ends[keep], name=df.index.name)
+    return resampled
+
+
+def resample_returns(df: pd.DataFrame, frequency: str) -> pd.DataFrame:
+    """
+    Compound a Date indexed frame of returns over each `frequency` period,
+    dated at the end of the period. Missing returns count as flat.
+
+    :returns: Pandas dataframe indexed by period end
+    :rtype: pd.DataFrame
+    """
+    if len(df) < 1:
+        return df
+    df = df.sort_index(kind="stable")
+    ends = pd.DatetimeIndex(period_end(df.index.to_series(), frequency))
+    growth = (1 + df.fillna(0)).groupby(ends).prod()
+    growth.index.name = df.index.name
+    return growth - 1
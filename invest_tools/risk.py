@@ -0,0 +1,164 @@
+import typing
+
+import numpy as np
+import pandas as pd
+
+from invest_tools import correlation
+
+BLOCK_SIZE = 256
+EWMA_DECAY = 0.94
+
+
+class InvalidEstimator(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+
+
+def _centred(returns: pd.DataFrame, weights: np.ndarray = None) -> np.ndarray:
+    values = returns.to_numpy(dtype=float, na_value=np.nan)
+    values = np.where(np.isnan(values), np.nanmean(values, axis=0), values)
+    return values - np.average(values, axis=0, weights=weights)
+
+
+def sample_covariance(
+    returns: pd.DataFrame, block_size: int = BLOCK_SIZE
+) -> pd.DataFrame:
+    """
+    Sample covariance of every pair of columns, matching `DataFrame.cov()`,
+    from `correlation.pairwise_moments`.
+
+    :returns: Square dataframe of covariances labelled by the input columns
+    :rtype: pd.DataFrame
+    """
+    n_columns = returns.shape[1]
+    matrix = np.empty((n_columns, n_columns))
+    moments = correlation.pairwise_moments(returns, block_size=block_size)
+    for block, count, cross, _, _ in moments:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            matrix[block] = cross / (count - 1)
+    return pd.DataFrame(matrix, index=returns.columns, columns=returns.columns)
+
+
+def ewma_covariance(returns: pd.DataFrame, decay: float = EWMA_DECAY) -> pd.DataFrame:
+    """
+    Exponentially weighted covariance where each period back carries `decay`
+    times the weight of the one after it, 0.94 being the RiskMetrics daily
+    choice. Missing returns count as the column mean.
+
+    :returns: Square dataframe of covariances labelled by the input columns
+    :rtype: pd.DataFrame
+    """
+    if not 0 < decay < 1:
+        raise InvalidEstimator(f"decay must be between 0 and 1, got {decay}")
+    weights = decay ** np.arange(len(returns))[::-1]
+    weights = weights / weights.sum()
+    centred = _centred(returns, weights)
+    matrix = (centred * weights[:, None]).T @ centred
+    return pd.DataFrame(matrix, index=returns.columns, columns=returns.columns)
+
+
+def ledoit_wolf_covariance(returns: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sample covariance shrunk towards a scaled identity by the Ledoit-Wolf
+    (2004) optimal intensity. Well conditioned even with more assets than
+    periods. Missing returns count as the column mean.
+
+    :returns: Square dataframe of covariances labelled by the input columns
+    :rtype: pd.DataFrame
+    """
+    centred = _centred(returns)
+    n_periods, n_columns = centred.shape
+    sample = centred.T @ centred / n_periods
+    target = np.trace(sample) / n_columns
+    dispersion = ((sample - target * np.eye(n_columns)) ** 2).sum() / n_columns
+    squared_norms = (centred * centred).sum(axis=1)
+    noise = ((squared_norms**2).sum() / n_periods - (sample**2).sum()) / n_periods
+    noise = min(noise / n_columns, dispersion)
+    shrinkage = noise / dispersion if dispersion > 0 else 0.0
+    matrix = shrinkage * target * np.eye(n_columns) + (1 - shrinkage) * sample
+    return pd.DataFrame(matrix, index=returns.columns, columns=returns.columns)
+
+
+ESTIMATORS = {
+    "sample": sample_covariance,
+    "ewma": ewma_covariance,
+    "ledoit_wolf": ledoit_wolf_covariance,
+}
+
+
+def estimate_covariance(
+    returns: pd.DataFrame, method: str = "sample", **params: typing.Any
+) -> pd.DataFrame:
+    """
+    Estimate the covariance of the columns of returns with one of
+    `ESTIMATORS`, passing `params` on to it.
+
+    :returns: Square dataframe of covariances labelled by the input columns
+    :rtype: pd.DataFrame
+    """
+    if method not in ESTIMATORS:
+        raise InvalidEstimator(f"{method} is not one of {list(ESTIMATORS)}")
+    return ESTIMATORS[method](returns, **params)
+
+
+def risk_contributions(
+    covariance: pd.DataFrame,
+    weights: typing.Union[pd.Series, pd.DataFrame, typing.Sequence[float]],
+) -> pd.DataFrame:
+    """
+    Split the volatility of one or many portfolios between their holdings.
+
+    `weights` is a vector over the covariance's assets, or a dataframe of
+    assets by portfolios. Each portfolio needs a single product with the
+    covariance, so many portfolios cost one matrix product together.
+
+    `marginal` is the change in volatility per unit of weight, `component`
+    the weight times the marginal risk, which sum to the volatility, and
+    `percent` the share of the volatility.
+
+    :returns: Pandas dataframe of `weight`, `marginal`, `component` and
+    `percent` per asset, indexed by portfolio and asset for many portfolios
+    :rtype: pd.DataFrame
+    """
+    assets = covariance.index
+    single = not isinstance(weights, pd.DataFrame)
+    if single and not isinstance(weights, pd.Series):
+        weights = pd.Series(np.asarray(weights, dtype=float), index=assets)
+    weights = weights.to_frame() if single else weights
+    w = weights.reindex(assets).fillna(0).to_numpy(dtype=float)
+    exposure = covariance.to_numpy(dtype=float) @ w
+    volatility = np.sqrt((w * exposure).sum(axis=0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        marginal = exposure / volatility
+        component = w * marginal
+        percent = component / volatility
+    columns = {
+        "weight": w,
+        "marginal": marginal,
+        "component": component,
+        "percent": percent,
+    }
+    if single:
+        return pd.DataFrame(
+            {name: values[:, 0] for name, values in columns.items()}, index=assets
+        )
+    index = pd.MultiIndex.from_product(
+        [weights.columns, assets], names=["portfolio", "asset"]
+    )
+    return pd.DataFrame(
+        {name: values.T.ravel() for name, values in columns.items()}, index=index
+    )
+
+
+def portfolio_volatility(covariance: pd.DataFrame, weights: pd.DataFrame) -> pd.Series:
+    """
+    Volatility of each column of a dataframe of assets by portfolios.
+
+    :returns: Pandas series of volatility per portfolio
+    :rtype: pd.Series
+    """
+    w = weights.reindex(covariance.index).fillna(0).to_numpy(dtype=float)
+    exposure = covariance.to_numpy(dtype=float) @ w
+    return pd.Series(
+        np.sqrt((w * exposure).sum(axis=0)), index=weights.columns, name="volatility"
+    )
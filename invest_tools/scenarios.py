@@ -0,0 +1,157 @@
+import typing
+
+import numpy as np
+import pandas as pd
+
+from invest_tools.currency import Currency
+
+SCENARIO_KEYS = {"name", "fx", "currencies", "assets", "market", "start", "end"}
+
+
+class InvalidScenario(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+
+
+def price_matrix(prices: pd.DataFrame) -> pd.DataFrame:
+    """
+    Pivot long prices into adjusted Close prices with a row per Date and a
+    column per TIDM, carrying the last price over missing days.
+
+    :returns: Pandas dataframe of prices indexed by Date
+    :rtype: pd.DataFrame
+    """
+    adjusted = prices.assign(Close=prices.Close * prices.Adjustment)
+    matrix = adjusted.pivot_table(
+        index="Date", columns="TIDM", values="Close", aggfunc="last"
+    )
+    return matrix.sort_index().ffill()
+
+
+def conversion_matrix(
+    dates: pd.DatetimeIndex,
+    currencies: pd.Series,
+    base_currency: Currency,
+    rates: pd.DataFrame,
+) -> pd.DataFrame:
+    """
+    The rate converting each asset's price into the base currency on every
+    date: one for assets already in the base currency and the `Convert` rate
+    of `rates`, carried over missing days, for foreign ones.
+
+    :returns: Pandas dataframe of rates with a column per asset
+    :rtype: pd.DataFrame
+    """
+    foreign = (currencies != base_currency.value).to_numpy()
+    if not foreign.any():
+        return pd.DataFrame(1.0, index=dates, columns=currencies.index)
+    rate = rates["Convert"].reindex(rates.index.union(dates)).sort_index().ffill()
+    rate = rate.reindex(dates).to_numpy(dtype=float)
+    converted = np.where(foreign, rate[:, None], 1.0)
+    return pd.DataFrame(converted, index=dates, columns=currencies.index)
+
+
+def _gather(
+    scenarios: typing.List[dict], key: str, columns: pd.Index, labels: pd.Index
+) -> np.ndarray:
+    """
+    Spread one kind of shock from every scenario over the assets: a scenarios
+    by `columns` frame of shocks is built in one go and gathered by `labels`,
+    the column each asset takes its shock from.
+    """
+    shocks = pd.DataFrame([scenario.get(key, {}) for scenario in scenarios])
+    shocks = shocks.reindex(columns=columns).fillna(0)
+    return shocks.reindex(columns=labels).to_numpy(dtype=float)
+
+
+def scenario_shocks(
+    scenarios: typing.List[dict],
+    currencies: pd.Series,
+    base_currency: Currency,
+    values: pd.DataFrame = None,
+) -> pd.DataFrame:
+    """
+    Return of every asset, in the base currency, under each scenario.
+
+    A scenario is a dictionary of any of:
+
+    - `fx`: moves of currencies against the base, `{"usd": 0.1}` meaning USD
+      gains 10%. A move of the base currency itself applies inversely to every
+      foreign asset, so `{"gbp": -0.15}` in a GBP portfolio lifts USD assets by
+      1 / 0.85 - 1.
+    - `currencies`: price moves of every asset denominated in a currency.
+    - `assets`: price moves of single assets by TIDM.
+    - `market`: a price move of every asset.
+    - `start` and `end`: replay the growth of `values`, the prices in the base
+      currency, over a historical window.
+
+    Price, FX and replayed moves compound. Each kind of shock is laid out as a
+    scenarios by assets array at once and the replay windows are found with
+    one `searchsorted` into the dates.
+
+    :returns: Pandas dataframe of asset returns with a row per scenario
+    :rtype: pd.DataFrame
+    """
+    for scenario in scenarios:
+        unknown = set(scenario) - SCENARIO_KEYS
+        if unknown:
+            raise InvalidScenario(f"unknown scenario keys {sorted(unknown)}")
+    assets = currencies.index
+    currency_names = pd.Index([c.value for c in Currency])
+    names = [
+        scenario.get("name", f"scenario_{i}") for i, scenario in enumerate(scenarios)
+    ]
+    foreign = (currencies != base_currency.value).to_numpy()
+
+    fx = _gather(scenarios, "fx", currency_names, pd.Index(currencies))
+    base = _gather(
+        scenarios, "fx", currency_names, pd.Index([base_currency.value] * len(assets))
+    )
+    fx_growth = np.where(foreign, (1 + fx) / (1 + base), 1.0)
+    price_growth = 1 + _gather(
+        scenarios, "currencies", currency_names, pd.Index(currencies)
+    )
+    price_growth *= 1 + _gather(scenarios, "assets", assets, assets)
+    market = np.array([scenario.get("market", 0.0) for scenario in scenarios])
+    growth = fx_growth * price_growth * (1 + market[:, None])
+
+    replay = np.array(["start" in s or "end" in s for s in scenarios], dtype=bool)
+    if replay.any():
+        if values is None:
+            raise InvalidScenario("prices are needed to replay a historical window")
+        values = values.reindex(columns=assets)
+        dates = values.index
+        windows = [s for s in scenarios if "start" in s or "end" in s]
+        starts = pd.DatetimeIndex([s.get("start", dates[0]) for s in windows])
+        ends = pd.DatetimeIndex([s.get("end", dates[-1]) for s in windows])
+        first = dates.searchsorted(starts, side="right") - 1
+        last = dates.searchsorted(ends, side="right") - 1
+        padded = np.vstack(
+            [np.full((1, len(assets)), np.nan), values.to_numpy(dtype=float)]
+        )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            replayed = padded[last + 1] / padded[first + 1]
+        replayed[(first < 0) | (last < first)] = np.nan
+        growth[replay] *= replayed
+
+    return pd.DataFrame(
+        growth - 1, index=pd.Index(names, name="scenario"), columns=assets
+    )
+
+
+def evaluate_scenarios(
+    shocks: pd.DataFrame, weights: typing.Union[pd.Series, pd.DataFrame]
+) -> pd.DataFrame:
+    """
+    Return of every portfolio under every scenario as one matrix product of
+    the scenario asset shocks and a vector, or assets by portfolios dataframe,
+    of weights.
+
+    :returns: Pandas dataframe with a row per scenario and a column per
+    portfolio
+    :rtype: pd.DataFrame
+    """
+    if isinstance(weights, pd.Series):
+        weights = weights.to_frame(weights.name or "portfolio")
+    weights = weights.reindex(shocks.columns).fillna(0)
+    return shocks @ weights
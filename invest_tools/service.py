@@ -0,0 +1,275 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import threading
+import typing
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from invest_tools import analysis, cache, graph, horizons, loaders, rebalance
+from invest_tools.currency import Currency, InvalidCurrencyException
+from invest_tools.log import logger
+from invest_tools.portfolio import Portfolio
+from invest_tools.validation import InvalidDataFrame, InvalidPortfolioDefinition
+
+MAX_BODY = 10 * 1024 * 1024
+STATUS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+CLIENT_ERRORS = (
+    InvalidPortfolioDefinition,
+    InvalidCurrencyException,
+    InvalidDataFrame,
+    analysis.InvalidMetric,
+    horizons.InvalidHorizon,
+    rebalance.InvalidSchedule,
+    graph.MissingInput,
+)
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _json_value(value: typing.Any) -> typing.Any:
+    if isinstance(value, dict):
+        return {k: _json_value(v) for k, v in value.items()}
+    if isinstance(value, pd.DataFrame):
+        return json.loads(value.to_json(orient="split", date_format="iso"))
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+class AnalysisService:
+    """
+    Serves portfolio results over HTTP from market data loaded once.
+
+    Built portfolios are kept warm in an LRU keyed by their definition, base
+    currency and rebalancing, so repeated requests reuse the built returns and
+    each portfolio's own result cache. Identical requests that arrive while
+    one is being calculated wait for that calculation instead of starting
+    another. The calculations themselves run in a thread pool so the event
+    loop keeps accepting connections.
+
+    | Method | Path | Body |
+    |--------|------|------|
+    | GET | /health | |
+    | POST | /build | `portfolio`, `currency`, `rebalance`, `threshold`, `transaction_cost` |
+    | POST | /analyse | as /build plus `metrics` |
+    | POST | /benchmark_analysis | as /build plus `as_of`, `window` |
+    """
+
+    def __init__(
+        self,
+        market_data: typing.Dict[str, pd.DataFrame],
+        max_workers: int = None,
+        max_portfolios: int = 256,
+    ):
+        self.market_data = market_data
+        self.executor = ThreadPoolExecutor(max_workers)
+        self.max_portfolios = max_portfolios
+        self.portfolios = OrderedDict()
+        self.portfolios_lock = threading.Lock()
+        self.in_flight = {}
+        self.evaluations = 0
+        self.routes = {
+            "/build": self.build,
+            "/analyse": self.analyse,
+            "/benchmark_analysis": self.benchmark_analysis,
+        }
+
+    @contextlib.contextmanager
+    def _portfolio(
+        self, request: typing.Dict[str, typing.Any]
+    ) -> typing.Iterator[Portfolio]:
+        """
+        Hold the warm portfolio for a request, building it on first use.
+
+        Only the LRU lookup is shared between requests. The build and any
+        analysis happen under the portfolio's own lock, so different
+        portfolios are calculated side by side.
+        """
+        build_options = {
+            "rebalance": request.get("rebalance"),
+            "threshold": request.get("threshold"),
+            "transaction_cost": request.get("transaction_cost", 0.0),
+        }
+        currency = request.get("currency", Currency.GBP.value)
+        try:
+            currency = Currency(currency)
+        except ValueError:
+            raise HTTPError(400, f"{currency} is not a valid currency")
+        key = cache.make_key(
+            "portfolio", request["portfolio"], currency.value, **build_options
+        )
+        with self.portfolios_lock:
+            warm = self.portfolios.get(key)
+            if warm is None:
+                port = Portfolio(request["portfolio"], currency, lazy=True)
+                for stage, data in self.market_data.items():
+                    setattr(port, stage, data)
+                warm = (port, threading.Lock())
+                self.portfolios[key] = warm
+                if len(self.portfolios) > self.max_portfolios:
+                    self.portfolios.popitem(last=False)
+            else:
+                self.portfolios.move_to_end(key)
+        port, lock = warm
+        with lock:
+            if not port.graph.is_computed("backtest"):
+                port.build(**build_options)
+            yield port
+
+    def build(self, request: typing.Dict[str, typing.Any]) -> typing.Any:
+        with self._portfolio(request) as port:
+            return {"backtest": port.backtest}
+
+    def analyse(self, request: typing.Dict[str, typing.Any]) -> typing.Any:
+        metrics = request.get("metrics")
+        if metrics is not None and not isinstance(metrics, list):
+            raise HTTPError(400, "metrics must be a list of metric names")
+        with self._portfolio(request) as port:
+            return {"analysis": port.analyse(metrics=metrics)}
+
+    def benchmark_analysis(self, request: typing.Dict[str, typing.Any]) -> typing.Any:
+        as_of = request.get("as_of")
+        try:
+            as_of = None if as_of is None else pd.Timestamp(as_of)
+        except (TypeError, ValueError):
+            raise HTTPError(400, f"{as_of} is not a valid date")
+        with self._portfolio(request) as port:
+            benchmark = port.benchmark_analysis(
+                as_of=as_of, window=request.get("window", "1Y")
+            )
+            return {"benchmark": benchmark}
+
+    def _evaluate(self, path: str, request: typing.Dict[str, typing.Any]) -> str:
+        self.evaluations += 1
+        return json.dumps(_json_value(self.routes[path](request)))
+
+    async def dispatch(self, method: str, path: str, body: bytes) -> str:
+        """
+        Run the request for `path`, sharing the result with any identical
+        request already in progress.
+
+        :returns: The JSON response body
+        """
+        if path == "/health":
+            return json.dumps({"status": "ok"})
+        if path not in self.routes:
+            raise HTTPError(404, f"{path} not found")
+        if method != "POST":
+            raise HTTPError(405, f"{method} not allowed on {path}")
+        try:
+            request = json.loads(body or b"{}")
+        except json.JSONDecodeError as e:
+            raise HTTPError(400, f"invalid JSON: {e}")
+        if not isinstance(request, dict) or not isinstance(
+            request.get("portfolio"), dict
+        ):
+            raise HTTPError(400, "request must have a portfolio definition")
+
+        key = cache.make_key(path, json.dumps(request, sort_keys=True))
+        future = self.in_flight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, self._evaluate, path, request)
+            self.in_flight[key] = future
+            future.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        try:
+            return await asyncio.shield(future)
+        except CLIENT_ERRORS as e:
+            raise HTTPError(400, f"{type(e).__name__}: {e}")
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        status, payload = 200, ""
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            if len(request_line) != 3:
+                raise HTTPError(400, "malformed request line")
+            method, path, _ = request_line
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            try:
+                length = int(headers.get("content-length", 0))
+            except ValueError:
+                length = -1
+            if length < 0:
+                raise HTTPError(400, "invalid Content-Length")
+            if length > MAX_BODY:
+                raise HTTPError(413, "request body too large")
+            body = await reader.readexactly(length) if length else b""
+            payload = await self.dispatch(method, path.split("?")[0], body)
+        except HTTPError as e:
+            status, payload = e.status, json.dumps({"error": str(e)})
+        except Exception as e:
+            logger.exception("request failed")
+            status, payload = 500, json.dumps({"error": f"{type(e).__name__}: {e}"})
+        data = payload.encode()
+        writer.write(
+            (
+                f"HTTP/1.1 {status} {STATUS[status]}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                "Connection: close\r\n\r\n"
+            ).encode()
+            + data
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080) -> asyncio.Server:
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        address = server.sockets[0].getsockname()
+        logger.info(f"serving on {address[0]}:{address[1]}")
+        return server
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8080) -> None:
+        server = await self.start(host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv: typing.List[str] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m invest_tools.service",
+        description="Serve portfolio analysis from market data held in memory.",
+    )
+    parser.add_argument("--prices", required=True, help="prices CSV or Parquet")
+    parser.add_argument("--fx", required=True, help="USD/GBP rates CSV or Parquet")
+    parser.add_argument("--benchmark", help="benchmark CSV or Parquet")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, help="calculation threads")
+    args = parser.parse_args(argv)
+    market_data = loaders.load_market_data(args.prices, args.fx, args.benchmark)
+    service = AnalysisService(market_data, max_workers=args.workers)
+    asyncio.run(service.serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,11 @@ import pandas as pd
 
 from invest_tools.currency import Currency, InvalidCurrencyException
 
+try:
+    from pyarrow import types as arrow_types
+except ImportError:  # pragma: no cover
+    arrow_types = None
+
 
 class InvalidDataFrame(Exception):
     def __init__(self, message):
@@ -36,6 +41,40 @@ def validate_datatypes(df: pd.DataFrame, column_types: typing.Dict[str, str]) ->
         raise InvalidDataFrame(f"Invalid DataFrame due to datatype error: {e}")
 
 
+def _arrow_type_matches(arrow_type, column_type) -> bool:
+    if arrow_types.is_dictionary(arrow_type):
+        arrow_type = arrow_type.value_type
+    if arrow_types.is_null(arrow_type):
+        return True
+    if column_type == "string":
+        return (
+            arrow_types.is_string(arrow_type)
+            or arrow_types.is_large_string(arrow_type)
+            or arrow_types.is_temporal(arrow_type)
+        )
+    return arrow_types.is_floating(arrow_type) or arrow_types.is_integer(arrow_type)
+
+
+def validate_schema(schema, column_types: typing.Dict[str, str]) -> bool:
+    """
+    Validate an Arrow schema against the same column types used for CSVs.
+
+    Every column must be present with a type that converts to the expected
+    one. "string" columns may also be typed as dates or timestamps and extra
+    columns, such as partition keys, are allowed.
+    """
+    missing = [col for col in column_types if col not in schema.names]
+    if missing:
+        raise InvalidDataFrame(f"Invalid DataFrame due to column error: {missing}")
+    for col, column_type in column_types.items():
+        arrow_type = schema.field(col).type
+        if not _arrow_type_matches(arrow_type, column_type):
+            raise InvalidDataFrame(
+                f"Invalid DataFrame due to datatype error: {col} is {arrow_type}"
+            )
+    return True
+
+
 def validate_portfolio_definition(
     definition: typing.Dict[str, typing.Dict[str, str]]
 ) -> bool:
@@ -1,6 +1,8 @@
+import numpy as np
 import pandas as pd
 import pytest
 from pandas import testing as tm
+from scipy import stats
 
 from invest_tools import analysis
 
@@ -87,3 +89,93 @@ def test_percentage_returns(clean_returns):
     pct = analysis.calculate_percentage_returns(clean_returns)
     true_pct = pd.Series([0.1, 0.2, 0.3, 0.4, 0.5], name="returns", dtype=float)
     tm.assert_series_equal(pct, true_pct)
+
+
+def test_calculate_metrics_selected(clean_returns):
+    """
+    GIVEN a pandas series of returns
+    WHEN calculate_metrics is called with a selection of metrics
+    THEN only those metrics are returned
+    """
+    metrics = analysis.calculate_metrics(
+        clean_returns, metrics=["daily_returns", "shapiro", "shapiro_p_value"]
+    )
+    assert list(metrics) == ["daily_returns", "shapiro", "shapiro_p_value"]
+    assert metrics["daily_returns"] == pytest.approx(0.003)
+    assert metrics["shapiro"] == pytest.approx(0.987, 0.01)
+
+
+def test_calculate_metrics_without_benchmark(clean_returns):
+    """
+    GIVEN a pandas series of returns and no benchmark
+    WHEN calculate_metrics is called with the default metrics
+    THEN the benchmark metrics are NaN
+    """
+    metrics = analysis.calculate_metrics(clean_returns)
+    assert list(metrics) == analysis.DEFAULT_METRICS
+    assert np.isnan(metrics["beta_covariance"])
+
+
+def test_register_metric(clean_returns):
+    """
+    GIVEN a user defined metric
+    WHEN it is registered and requested
+    THEN it is calculated from the shared context
+    """
+
+    @analysis.register_metric("test_range")
+    def test_range(context):
+        return context.values.max() - context.values.min()
+
+    metrics = analysis.calculate_metrics(clean_returns, metrics=["test_range"])
+    assert metrics["test_range"] == pytest.approx(0.004)
+    del analysis.METRICS["test_range"]
+
+
+def test_calculate_metrics_unknown(clean_returns):
+    """
+    GIVEN a pandas series of returns
+    WHEN calculate_metrics is called with an unknown metric
+    THEN InvalidMetric is raised
+    """
+    with pytest.raises(analysis.InvalidMetric):
+        analysis.calculate_metrics(clean_returns, metrics=["unknown"])
+
+
+def test_calculate_metrics_periods_per_year():
+    """
+    GIVEN weekly returns
+    WHEN calculate_metrics is called
+    THEN annual metrics use 52 periods a year unless told otherwise
+    """
+    returns = pd.Series(
+        [0.01, 0.02, 0.0, 0.01], index=pd.date_range("2023-01-01", periods=4, freq="W")
+    )
+    metrics = ["annual_returns", "annual_std"]
+    weekly = analysis.calculate_metrics(returns, metrics=metrics)
+    monthly = analysis.calculate_metrics(returns, metrics=metrics, periods_per_year=12)
+    assert weekly["annual_returns"] == pytest.approx(1.01**52 - 1)
+    assert weekly["annual_std"] == pytest.approx(returns.std(ddof=0) * np.sqrt(52))
+    assert monthly["annual_returns"] == pytest.approx(1.01**12 - 1)
+
+
+def test_calculate_metrics_shared_moments():
+    """
+    GIVEN portfolio and benchmark returns with a missing benchmark value
+    WHEN calculate_metrics is called
+    THEN the moments match scipy and both betas match the regression slope
+    """
+    rng = np.random.default_rng(0)
+    benchmark = rng.normal(0, 0.01, 100)
+    portfolio = 0.8 * benchmark + rng.normal(0, 0.005, 100)
+    backtest = pd.DataFrame(
+        {"portfolio_returns": portfolio, "benchmark_returns": benchmark}
+    )
+    backtest.iloc[3, 1] = np.nan
+    returns = backtest.portfolio_returns
+    metrics = analysis.calculate_metrics(returns, backtest)
+    assert metrics["skew"] == pytest.approx(stats.skew(returns))
+    assert metrics["kurtosis"] == pytest.approx(stats.kurtosis(returns))
+    slope = analysis.calculate_beta_capm(backtest)
+    assert metrics["beta_capm"] == pytest.approx(slope)
+    assert metrics["beta_covariance"] == pytest.approx(slope)
@@ -0,0 +1,107 @@
+import pandas as pd
+
+from invest_tools import cache
+
+
+def test_fingerprint_tracks_content():
+    """
+    GIVEN two equal series and a changed copy
+    WHEN cache.fingerprint is called
+    THEN equal content gives equal fingerprints
+    """
+    series = pd.Series([0.1, 0.2, 0.3], name="returns")
+    changed = series.copy()
+    changed.iloc[1] = 0.25
+    assert cache.fingerprint(series) == cache.fingerprint(series.copy())
+    assert cache.fingerprint(series) != cache.fingerprint(changed)
+
+
+def test_make_key_uses_params():
+    """
+    GIVEN the same input
+    WHEN cache.make_key is called with different parameters
+    THEN different keys are returned
+    """
+    series = pd.Series([0.1, 0.2, 0.3])
+    assert cache.make_key("a", series, n=1) == cache.make_key("a", series, n=1)
+    assert cache.make_key("a", series, n=1) != cache.make_key("a", series, n=2)
+
+
+def test_result_cache_lru_eviction():
+    """
+    GIVEN a cache with a max size of two
+    WHEN three entries are stored
+    THEN the least recently used entry is evicted
+    """
+    result_cache = cache.ResultCache(max_size=2)
+    result_cache.set("a", 1)
+    result_cache.set("b", 2)
+    result_cache.get("a")
+    result_cache.set("c", 3)
+    assert "a" in result_cache
+    assert "b" not in result_cache
+    assert "c" in result_cache
+
+
+def test_result_cache_invalidate():
+    """
+    GIVEN cached entries with dependencies
+    WHEN a dependency is invalidated
+    THEN only the entries depending on it are dropped
+    """
+    result_cache = cache.ResultCache()
+    result_cache.set("a", 1, depends_on=["backtest"])
+    result_cache.set("b", 2, depends_on=["benchmark"])
+    assert result_cache.invalidate("backtest") == 1
+    assert "a" not in result_cache
+    assert "b" in result_cache
+
+
+def test_result_cache_disk_tier(tmp_path):
+    """
+    GIVEN a cache backed by a directory
+    WHEN a new cache is created on the same directory
+    THEN previously computed results are read from disk
+    """
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"value": 1}
+
+    cache.ResultCache(cache_dir=tmp_path).get_or_compute("k", compute)
+    value = cache.ResultCache(cache_dir=tmp_path).get_or_compute("k", compute)
+    assert value == {"value": 1}
+    assert len(calls) == 1
+
+
+def test_result_cache_disk_tier_bounded(tmp_path):
+    """
+    GIVEN a cache with small memory and disk tiers
+    WHEN more entries are stored than the disk holds
+    THEN the oldest files are removed and clear empties the directory
+    """
+    result_cache = cache.ResultCache(max_size=2, cache_dir=tmp_path, max_disk_size=3)
+    for key in "abcde":
+        result_cache.set(key, key, depends_on=["backtest"])
+    assert sorted(p.stem for p in tmp_path.iterdir()) == ["c", "d", "e"]
+    assert "a" not in result_cache
+    assert result_cache.dependencies["backtest"] == {"c", "d", "e"}
+
+    result_cache.clear()
+    assert list(tmp_path.iterdir()) == []
+    assert "c" not in result_cache
+    assert result_cache.get("c") is None
+
+
+def test_result_cache_eviction_prunes_dependencies():
+    """
+    GIVEN a memory only cache
+    WHEN entries are evicted
+    THEN their dependency records are dropped
+    """
+    result_cache = cache.ResultCache(max_size=2)
+    for key in "abcde":
+        result_cache.set(key, key, depends_on=[f"dep_{key}"])
+    assert set(result_cache.dependencies) == {"dep_d", "dep_e"}
+    assert set(result_cache.key_dependencies) == {"d", "e"}
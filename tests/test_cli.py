@@ -0,0 +1,90 @@
+import json
+
+import pandas as pd
+import pytest
+
+from invest_tools import cli
+
+
+@pytest.fixture()
+def definitions(tmp_path):
+    path = tmp_path / "portfolios.jsonl"
+    records = [
+        {"name": "usd", "portfolio": {"TEST": {"weight": 1, "currency": "usd"}}},
+        {"TEST": {"weight": 1, "currency": "gbp"}},
+        {"name": "invalid", "portfolio": {"TEST": {"weight": 0.5, "currency": "usd"}}},
+    ]
+    path.write_text("\n".join(json.dumps(r) for r in records))
+    return str(path)
+
+
+def test_read_definitions_directory(tmp_path):
+    """
+    GIVEN a directory of json portfolio definitions
+    WHEN read_definitions is called
+    THEN every definition is named by its file
+    """
+    (tmp_path / "a.json").write_text(
+        json.dumps({"EG": {"weight": 1, "currency": "gbp"}})
+    )
+    (tmp_path / "b.json").write_text(
+        json.dumps(
+            {"portfolio": {"EG": {"weight": 1, "currency": "gbp"}}, "currency": "usd"}
+        )
+    )
+    definitions = cli.read_definitions(str(tmp_path))
+    assert [(name, currency) for name, _, currency in definitions] == [
+        ("a", None),
+        ("b", "usd"),
+    ]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_main_jsonl(definitions, prices, currency, benchmark, tmp_path, workers):
+    """
+    GIVEN a jsonl file of portfolio definitions
+    WHEN the cli is run
+    THEN a result is written for every portfolio with failures reported
+    """
+    output = tmp_path / "results.jsonl"
+    code = cli.main(
+        [
+            definitions,
+            "--prices",
+            prices,
+            "--fx",
+            currency,
+            "--benchmark",
+            benchmark,
+            "--metrics",
+            "daily_returns,beta_covariance",
+            "--workers",
+            str(workers),
+            "--output",
+            str(output),
+        ]
+    )
+    records = {
+        r["portfolio"]: r for r in map(json.loads, output.read_text().splitlines())
+    }
+    assert code == 1
+    assert set(records) == {"usd", "1", "invalid"}
+    assert records["usd"]["error"] is None
+    assert records["usd"]["daily_returns"] == 0
+    assert "InvalidPortfolioDefinition" in records["invalid"]["error"]
+
+
+def test_main_parquet(definitions, prices, currency, tmp_path):
+    """
+    GIVEN a jsonl file of portfolio definitions
+    WHEN the cli is run with a parquet output
+    THEN the results are written to parquet
+    """
+    pytest.importorskip("pyarrow")
+    output = tmp_path / "results.parquet"
+    cli.main(
+        [definitions, "--prices", prices, "--fx", currency, "--output", str(output)]
+    )
+    results = pd.read_parquet(output)
+    assert list(results.portfolio) == ["usd", "1", "invalid"]
+    assert "max_drawdown" in results
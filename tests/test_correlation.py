@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pandas import testing as tm
+
+from invest_tools import correlation
+
+
+@pytest.fixture()
+def stock_returns():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(0, 0.01, (60, 7)), columns=list("ABCDEFG"))
+    df["H"] = df["A"] * 2 + rng.normal(0, 0.001, 60)
+    df.iloc[:5, 1] = np.nan
+    df.iloc[10:20, 3] = np.nan
+    return df
+
+
+def test_correlation_matrix_matches_pandas(stock_returns):
+    """
+    GIVEN a dataframe of returns with missing values
+    WHEN calculate_correlation_matrix is called with a small block size
+    THEN it matches the pairwise pandas correlation
+    """
+    matrix = correlation.calculate_correlation_matrix(stock_returns, block_size=3)
+    tm.assert_frame_equal(matrix, stock_returns.corr())
+
+
+def test_correlation_matrix_float32(stock_returns):
+    """
+    GIVEN a dataframe of returns
+    WHEN calculate_correlation_matrix is called with float32
+    THEN the matrix is float32 and close to the float64 answer
+    """
+    matrix = correlation.calculate_correlation_matrix(stock_returns, dtype=np.float32)
+    assert matrix.values.dtype == np.float32
+    np.testing.assert_allclose(matrix.values, stock_returns.corr().values, atol=1e-4)
+
+
+def test_top_correlated_pairs(stock_returns):
+    """
+    GIVEN a correlation matrix
+    WHEN top_correlated_pairs is called
+    THEN the strongest pair is returned first
+    """
+    matrix = correlation.calculate_correlation_matrix(stock_returns)
+    pairs = correlation.top_correlated_pairs(matrix, k=3)
+    assert len(pairs) == 3
+    assert {pairs["first"][0], pairs["second"][0]} == {"A", "H"}
+    assert pairs.correlation.abs().is_monotonic_decreasing
+
+
+def test_cluster_order(stock_returns):
+    """
+    GIVEN a correlation matrix
+    WHEN cluster_order is called
+    THEN every security is returned once and correlated ones are adjacent
+    """
+    matrix = correlation.calculate_correlation_matrix(stock_returns)
+    order = correlation.cluster_order(matrix)
+    assert sorted(order) == sorted(stock_returns.columns)
+    assert abs(order.index("A") - order.index("H")) == 1
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from invest_tools import drawdown
+
+
+@pytest.fixture()
+def returns():
+    index = pd.date_range("2023-01-01", periods=8)
+    return pd.DataFrame(
+        {
+            "A": [0.1, -0.5, 0.2, 0.8, 0.1, -0.1, -0.1, 0.1],
+            "B": [-0.1, 0.05, 0.1, 0.0, 0.0, 0.0, 0.0, 0.0],
+            "C": [0.01] * 8,
+        },
+        index=index,
+    )
+
+
+def test_underwater(returns):
+    """
+    GIVEN a dataframe of returns
+    WHEN calculate_underwater is called
+    THEN the drawdown from the running peak of wealth is returned
+    """
+    underwater = drawdown.calculate_underwater(returns["A"])
+    wealth = (1 + returns["A"]).cumprod()
+    expected = wealth / wealth.cummax().clip(lower=1) - 1
+    np.testing.assert_allclose(underwater, expected)
+
+
+def test_max_drawdown(clean_returns, returns):
+    """
+    GIVEN returns with and without losses
+    WHEN calculate_max_drawdown is called
+    THEN the deepest drawdown is returned as a negative fraction
+    """
+    assert drawdown.calculate_max_drawdown(clean_returns) == 0
+    assert drawdown.calculate_max_drawdown(returns["A"]) == pytest.approx(-0.5)
+    assert drawdown.calculate_max_drawdown(returns)["B"] == pytest.approx(-0.1)
+
+
+def test_drawdown_summary(returns):
+    """
+    GIVEN a dataframe of returns
+    WHEN drawdown_summary is called
+    THEN the peak, trough and recovery of every column are returned
+    """
+    summary = drawdown.drawdown_summary(returns)
+    a = summary.loc["A"]
+    assert a.peak == pd.Timestamp("2023-01-01")
+    assert a.trough == pd.Timestamp("2023-01-02")
+    assert a.recovery == pd.Timestamp("2023-01-04")
+    assert a.duration_periods == 3
+    assert pd.isna(summary.loc["B", "peak"])
+    assert summary.loc["B", "recovery"] == pd.Timestamp("2023-01-03")
+    assert summary.loc["C", "max_drawdown"] == 0
+
+
+def test_top_drawdowns(returns):
+    """
+    GIVEN a dataframe of returns
+    WHEN top_drawdowns is called
+    THEN every episode of every column is ordered by depth
+    """
+    episodes = drawdown.top_drawdowns(returns, n=2)
+    assert list(episodes.loc["A"].max_drawdown) == pytest.approx([-0.5, -0.19])
+    assert pd.isna(episodes.loc[("A", 1), "recovery"])
+    assert len(episodes.loc["B"]) == 1
+    assert "C" not in episodes.index.get_level_values("column")
+
+
+def test_drawdowns_empty():
+    """
+    GIVEN empty returns
+    WHEN the drawdown functions are called
+    THEN no drawdown is reported rather than raising
+    """
+    returns = pd.DataFrame({"a": [], "b": []}, dtype=float)
+    summary = drawdown.drawdown_summary(returns)
+    assert list(summary.max_drawdown) == [0.0, 0.0]
+    assert summary.peak.isna().all()
+    assert len(drawdown.top_drawdowns(returns)) == 0
+    assert len(drawdown.top_drawdowns(returns.a)) == 0
+    assert list(drawdown.calculate_max_drawdown(returns)) == [0.0, 0.0]
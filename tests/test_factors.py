@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+import pytest
+import statsmodels.api as sm
+
+from invest_tools import factors
+
+
+@pytest.fixture()
+def factor_returns():
+    rng = np.random.default_rng(0)
+    index = pd.bdate_range("2022-01-03", periods=200)
+    return pd.DataFrame(
+        rng.normal(0, 0.01, (200, 2)), index=index, columns=["market", "value"]
+    )
+
+
+@pytest.fixture()
+def returns(factor_returns):
+    rng = np.random.default_rng(1)
+    exposures = np.array([[1.2, 0.8, -0.3], [0.5, -0.4, 0.0]])
+    noise = rng.normal(0, 0.005, (len(factor_returns), 3))
+    df = pd.DataFrame(
+        factor_returns.to_numpy() @ exposures + noise + 0.001,
+        index=factor_returns.index,
+        columns=["a", "b", "c"],
+    )
+    df.iloc[:15, 1] = np.nan
+    return df
+
+
+def _ols(returns, factor_returns):
+    fit = sm.OLS(returns, sm.add_constant(factor_returns), missing="drop").fit()
+    return fit.params.to_numpy(), fit.rsquared, np.sqrt(fit.scale)
+
+
+def test_factor_regression(returns, factor_returns):
+    """
+    GIVEN returns with gaps and factor returns
+    WHEN factor_regression is called
+    THEN every column matches its own least squares fit
+    """
+    result = factors.factor_regression(returns, factor_returns)
+    assert list(result.columns) == [
+        "alpha",
+        "market",
+        "value",
+        "r_squared",
+        "residual_risk",
+        "observations",
+    ]
+    for column in returns:
+        params, r_squared, residual_risk = _ols(returns[column], factor_returns)
+        row = result.loc[column]
+        assert np.allclose(row[["alpha", "market", "value"]], params)
+        assert row.r_squared == pytest.approx(r_squared)
+        assert row.residual_risk == pytest.approx(residual_risk)
+    assert result.loc["b", "observations"] == 185
+
+
+def test_factor_regression_rolling(returns, factor_returns):
+    """
+    GIVEN returns and factor returns
+    WHEN factor_regression is called with a window
+    THEN each window matches a fit over just those periods
+    """
+    result = factors.factor_regression(returns, factor_returns, window=40)
+    dates = returns.index
+    assert len(result) == (len(dates) - 39) * 3
+    for end in [39, 120, 199]:
+        window = slice(end - 39, end + 1)
+        for column in returns:
+            params, r_squared, _ = _ols(
+                returns[column].iloc[window], factor_returns.iloc[window]
+            )
+            row = result.loc[(dates[end], column)]
+            assert np.allclose(row[["alpha", "market", "value"]], params)
+            assert row.r_squared == pytest.approx(r_squared)
+
+
+def test_factor_regression_too_few_observations(returns, factor_returns):
+    """
+    GIVEN a window with fewer observations than parameters
+    WHEN factor_regression is called
+    THEN that regression is missing
+    """
+    result = factors.factor_regression(returns, factor_returns, window=4)
+    assert result.loc[(returns.index[10], "b")].isna()["alpha"]
+    assert result.loc[(returns.index[10], "b"), "observations"] == 0
+    assert not result.loc[(returns.index[10], "a")].isna().any()
+
+
+def test_factor_regression_singular_window(returns, factor_returns):
+    """
+    GIVEN a factor that is flat through the first windows
+    WHEN factor_regression is called with a window
+    THEN the singular windows still get a least squares fit and the rest
+    match their own fits
+    """
+    factor_returns.iloc[:50, 1] = 0.0
+    result = factors.factor_regression(returns, factor_returns, window=40)
+    dates = returns.index
+    singular = result.loc[(dates[39], "a")]
+    assert singular["value"] == pytest.approx(0.0)
+    assert np.isfinite(singular[["alpha", "market", "r_squared"]]).all()
+    window = slice(80, 120)
+    params, r_squared, _ = _ols(returns["a"].iloc[window], factor_returns.iloc[window])
+    assert np.allclose(
+        result.loc[(dates[119], "a"), ["alpha", "market", "value"]], params
+    )
+
+
+@pytest.mark.parametrize("window", [0, -5])
+def test_factor_regression_invalid_window(returns, factor_returns, window):
+    """
+    GIVEN a window of no periods
+    WHEN factor_regression is called
+    THEN InvalidWindow is raised
+    """
+    with pytest.raises(factors.InvalidWindow):
+        factors.factor_regression(returns, factor_returns, window=window)
+
+
+def test_factor_regression_collinear(returns, factor_returns):
+    """
+    GIVEN a factor that is a multiple of another
+    WHEN factor_regression is called with and without a missing return
+    THEN both give the same minimum norm fit
+    """
+    collinear = factor_returns.assign(value=2 * factor_returns.market)
+    gappy = returns.copy()
+    gappy.iloc[0, 0] = np.nan
+    full = factors.factor_regression(returns[["a"]], collinear)
+    missing = factors.factor_regression(gappy[["a"]], collinear)
+    exposures = ["alpha", "market", "value"]
+    assert full.loc["a", "value"] == pytest.approx(2 * full.loc["a", "market"])
+    assert np.allclose(full.loc["a", exposures], missing.loc["a", exposures], atol=1e-3)
@@ -0,0 +1,56 @@
+import pytest
+
+from invest_tools import graph
+
+
+@pytest.fixture()
+def dependency_graph():
+    calls = []
+    g = graph.DependencyGraph()
+    g.add_input("a", 1)
+    g.add_input("b", 2)
+    g.add_node("double", lambda: calls.append("double") or g.get("a") * 2, ["a"])
+    g.add_node(
+        "total",
+        lambda: calls.append("total") or g.get("double") + g.get("b"),
+        ["double", "b"],
+    )
+    return g, calls
+
+
+def test_graph_computes_on_demand(dependency_graph):
+    """
+    GIVEN a graph of inputs and computed nodes
+    WHEN a node is requested twice
+    THEN it and its dependencies are computed once
+    """
+    g, calls = dependency_graph
+    assert g.get("total") == 4
+    assert g.get("total") == 4
+    assert calls == ["double", "total"]
+
+
+def test_graph_invalidates_dependents(dependency_graph):
+    """
+    GIVEN a fully computed graph
+    WHEN an input is changed
+    THEN only the nodes depending on it are recomputed
+    """
+    g, calls = dependency_graph
+    g.get("total")
+    g.set("b", 10)
+    assert g.is_computed("double")
+    assert g.get("total") == 12
+    assert calls == ["double", "total", "total"]
+
+
+def test_graph_missing_input():
+    """
+    GIVEN a graph with an unset input
+    WHEN it is requested
+    THEN MissingInput is raised
+    """
+    g = graph.DependencyGraph()
+    g.add_input("a")
+    with pytest.raises(graph.MissingInput):
+        g.get("a")
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from invest_tools import horizons
+
+
+@pytest.fixture()
+def returns():
+    rng = np.random.default_rng(0)
+    index = pd.bdate_range("2020-06-01", "2023-03-31")
+    return pd.DataFrame(
+        {
+            "portfolio_returns": rng.normal(0.0004, 0.01, len(index)),
+            "benchmark_returns": rng.normal(0.0003, 0.01, len(index)),
+        },
+        index=index,
+    )
+
+
+@pytest.mark.parametrize(
+    "horizon,start",
+    [
+        ("1M", "2023-02-28"),
+        ("3M", "2022-12-31"),
+        ("YTD", "2022-12-31"),
+        ("1Y", "2022-03-31"),
+        ("10D", "2023-03-21"),
+        ("SI", "2020-05-31"),
+    ],
+)
+def test_horizon_start(horizon, start):
+    """
+    GIVEN an as of date
+    WHEN horizon_start is called
+    THEN the start of the horizon is returned
+    """
+    as_of = pd.Timestamp("2023-03-31")
+    inception = pd.Timestamp("2020-06-01")
+    assert horizons.horizon_start(as_of, horizon, inception) == pd.Timestamp(start)
+
+
+def test_horizon_start_invalid():
+    """
+    GIVEN an unknown horizon
+    WHEN horizon_start is called
+    THEN InvalidHorizon is raised
+    """
+    with pytest.raises(horizons.InvalidHorizon):
+        horizons.horizon_start(pd.Timestamp("2023-03-31"), "1X", None)
+
+
+def test_horizon_returns(returns):
+    """
+    GIVEN portfolio and benchmark returns
+    WHEN horizon_returns is called
+    THEN every horizon matches compounding the returns in its window
+    """
+    wealth = horizons.cumulative_wealth(returns)
+    result = horizons.horizon_returns(wealth, as_of="2023-03-15")
+    for horizon, start in [("1M", "2023-02-15"), ("1Y", "2022-03-15")]:
+        window = returns.loc[(returns.index > start) & (returns.index <= "2023-03-15")]
+        expected = (1 + window).prod() - 1
+        assert result.loc[horizon, "portfolio"] == pytest.approx(
+            expected.portfolio_returns
+        )
+        excess = window.portfolio_returns - window.benchmark_returns
+        assert result.loc[horizon, "excess"] == pytest.approx((1 + excess).prod() - 1)
+    since_inception = (1 + returns.loc[:"2023-03-15"]).prod() - 1
+    assert result.loc["SI", "benchmark"] == pytest.approx(
+        since_inception.benchmark_returns
+    )
+    assert np.isnan(result.loc["5Y", "portfolio"])
+    years = 2 + (pd.Timestamp("2023-03-15") - pd.Timestamp("2022-05-31")).days / 365.25
+    assert result.loc["1Y", "portfolio_annualised"] == pytest.approx(
+        result.loc["1Y", "portfolio"]
+    )
+    assert result.loc["SI", "portfolio_annualised"] == pytest.approx(
+        (1 + result.loc["SI", "portfolio"]) ** (1 / years) - 1
+    )
+
+
+def test_window_returns(returns):
+    """
+    GIVEN precomputed wealth
+    WHEN window_returns is called
+    THEN it matches compounding the returns in the window
+    """
+    wealth = horizons.cumulative_wealth(returns)
+    window = horizons.window_returns(
+        wealth, pd.Timestamp("2022-01-31"), pd.Timestamp("2022-06-30")
+    )
+    expected = (1 + returns.loc["2022-02-01":"2022-06-30"]).cumprod() - 1
+    pd.testing.assert_frame_equal(window[expected.columns], expected)
@@ -0,0 +1,127 @@
+import pandas as pd
+import pytest
+
+from invest_tools import loaders, validation
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+@pytest.fixture()
+def prices_table():
+    dates = pd.date_range("2023-01-01", periods=4)
+    df = pd.DataFrame(
+        {
+            "TIDM": ["TEST"] * 4 + ["OTHER"] * 4,
+            "Date": list(dates) * 2,
+            "Open": 1.0,
+            "High": 1.0,
+            "Low": 1.0,
+            "Close": [1.0, 1.1, 1.2, 1.3, 2.0, 2.1, 2.2, 2.3],
+            "Volume": 1.0,
+            "Adjustment": 1.0,
+        }
+    )
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def test_is_arrow_source(prices, prices_table, tmp_path):
+    """
+    GIVEN csv, parquet, directory and in-memory sources
+    WHEN is_arrow_source is called
+    THEN only the Arrow sources are read with Arrow
+    """
+    directory = tmp_path / "Prices"
+    directory.mkdir()
+    assert not loaders.is_arrow_source(prices)
+    assert loaders.is_arrow_source("prices.PARQUET")
+    assert loaders.is_arrow_source(tmp_path)
+    assert loaders.is_arrow_source(str(directory))
+    assert loaders.is_arrow_source(prices_table)
+
+
+def test_load_prices_partitioned_parquet(prices_table, tmp_path):
+    """
+    GIVEN prices stored as parquet partitioned by TIDM
+    WHEN load_prices is called with codes and dates
+    THEN only the used columns and matching rows are returned
+    """
+    pq.write_to_dataset(prices_table, tmp_path, partition_cols=["TIDM"])
+    df = loaders.load_prices(
+        tmp_path, codes=["TEST"], start="2023-01-02", end="2023-01-03"
+    )
+    assert list(df.columns) == loaders.PRICES_COLUMNS
+    assert set(df.TIDM) == {"TEST"}
+    assert list(df.Close) == [1.1, 1.2]
+
+
+def test_load_prices_arrow_table(prices):
+    """
+    GIVEN an in-memory Arrow table of the csv prices
+    WHEN load_prices is called on both
+    THEN the same prices are returned
+    """
+    table = pa.Table.from_pandas(pd.read_csv(prices), preserve_index=False)
+    from_arrow = loaders.load_prices(table)
+    from_csv = loaders.load_prices(prices)[loaders.PRICES_COLUMNS]
+    pd.testing.assert_frame_equal(from_arrow, from_csv)
+
+
+def test_load_prices_timezone_aware(prices_table):
+    """
+    GIVEN an Arrow table of prices with UTC timestamps
+    WHEN load_prices is called with a start date
+    THEN the matching prices are returned with naive dates
+    """
+    dates = prices_table.column("Date").cast(pa.timestamp("ns", tz="UTC"))
+    table = prices_table.set_column(
+        prices_table.schema.get_field_index("Date"), "Date", dates
+    )
+    df = loaders.load_prices(table, codes=["TEST"], start="2023-01-03")
+    assert list(df.Date) == list(pd.date_range("2023-01-03", periods=2))
+
+
+def test_load_prices_invalid_schema(prices_table):
+    """
+    GIVEN an Arrow table missing a column
+    WHEN load_prices is called
+    THEN InvalidDataFrame is raised
+    """
+    with pytest.raises(validation.InvalidDataFrame):
+        loaders.load_prices(prices_table.drop(["Adjustment"]))
+    with pytest.raises(validation.InvalidDataFrame):
+        loaders.load_prices(
+            prices_table.set_column(5, "Close", pa.array(["a"] * 8, type=pa.string()))
+        )
+
+
+def test_load_benchmark_parquet(benchmark, tmp_path):
+    """
+    GIVEN a benchmark stored as a parquet file with string dates
+    WHEN load_benchmark is called
+    THEN it matches loading the csv
+    """
+    path = tmp_path / "benchmark.parquet"
+    pd.read_csv(benchmark).to_parquet(path)
+    pd.testing.assert_frame_equal(
+        loaders.load_benchmark(path), loaders.load_benchmark(benchmark)
+    )
+
+
+def test_load_prices_intraday_csv(tmp_path):
+    """
+    GIVEN a CSV of prices with a time of day after each date
+    WHEN load_prices is called
+    THEN the dates keep their times
+    """
+    source = tmp_path / "prices.csv"
+    source.write_text(
+        "TIDM,Date,Open,High,Low,Close,Volume,Adjustment\n"
+        "TEST,02/01/2023 09:00,1,1,1,1,1,1\n"
+        "TEST,02/01/2023 13:30,1,1,1,1.1,1,1\n"
+    )
+    df = loaders.load_prices(source)
+    assert list(df.Date) == [
+        pd.Timestamp("2023-01-02 09:00"),
+        pd.Timestamp("2023-01-02 13:30"),
+    ]
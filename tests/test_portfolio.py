@@ -1,3 +1,8 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from invest_tools import analysis, graph
 from invest_tools.currency import Currency
 from invest_tools.portfolio import Portfolio
 
@@ -111,3 +116,336 @@ def test_benchmark_analysis(portfolio_definition, currency, prices, benchmark):
     port.benchmark_analysis()
 
     assert len(port.benchmark) > 0
+
+
+def test_portfolio_correlation_matrix(portfolio_definition, currency, prices):
+    """
+    GIVEN a portfolio that has already been built
+    WHEN portfolio.correlation_matrix is called
+    THEN the matrix is calculated and cached
+    """
+    cur = Currency.GBP
+    port = Portfolio(portfolio_definition, cur)
+    port.get_usd_converter(currency)
+    port.get_prices(prices)
+    port.build()
+    matrix = port.correlation_matrix()
+
+    assert list(matrix.columns) == ["TEST"]
+    assert port.correlation_matrix() is matrix
+
+
+def test_portfolio_analyse_cached(portfolio_definition, currency, prices, benchmark):
+    """
+    GIVEN a portfolio that has already been analysed
+    WHEN portfolio.analyse is called again
+    THEN the result comes from the cache until the rebalancing changes
+    """
+    cur = Currency.GBP
+    port = Portfolio(portfolio_definition, cur)
+    port.get_usd_converter(currency)
+    port.get_prices(prices)
+    port.build()
+    port.get_benchmark(benchmark)
+    port.analyse()
+    hits = port.cache.hits
+    port.analyse()
+    assert port.cache.hits == hits + 1
+
+    port.build()
+    assert len(port.cache) > 0
+
+    port.build(rebalance="M")
+    assert len(port.cache) == 0
+
+
+def test_portfolio_analyse_reregistered_metric(portfolio_definition, currency, prices):
+    """
+    GIVEN a portfolio analysed with a user defined metric
+    WHEN the metric is registered again with a different function
+    THEN the new function is used rather than the cached result
+    """
+    port = Portfolio(portfolio_definition, Currency.GBP)
+    port.get_usd_converter(currency)
+    port.get_prices(prices)
+    port.build()
+    analysis.register_metric("test_constant", lambda c: 1.0)
+    assert port.analyse(metrics=["test_constant"]) == {"test_constant": 1.0}
+    analysis.register_metric("test_constant", lambda c: 2.0)
+    assert port.analyse(metrics=["test_constant"]) == {"test_constant": 2.0}
+    del analysis.METRICS["test_constant"]
+
+
+def test_portfolio_lazy(portfolio_definition, currency, prices, benchmark):
+    """
+    GIVEN a lazy portfolio with data loaded in any order
+    WHEN the analysis attribute is read
+    THEN only the stages it needs are computed
+    """
+    cur = Currency.GBP
+    port = Portfolio(portfolio_definition, cur, lazy=True)
+    port.get_benchmark(benchmark)
+    port.get_prices(prices)
+    port.get_usd_converter(currency)
+    assert not port.graph.is_computed("backtest")
+
+    assert "daily_returns" in port.analysis
+    assert "benchmark_returns" in port.backtest
+    assert not port.graph.is_computed("benchmark")
+
+    port.get_benchmark(benchmark)
+    assert port.graph.is_computed("clean_returns")
+    assert not port.graph.is_computed("analysis")
+
+
+def test_portfolio_analyse_metrics(portfolio_definition, currency, prices):
+    """
+    GIVEN a portfolio that has already been built
+    WHEN portfolio.analyse is called with a list of metrics
+    THEN only those metrics are calculated
+    """
+    cur = Currency.GBP
+    port = Portfolio(portfolio_definition, cur)
+    port.get_usd_converter(currency)
+    port.get_prices(prices)
+    port.build()
+    port.analyse(metrics=["daily_returns", "daily_std"])
+
+    assert list(port.analysis) == ["daily_returns", "daily_std"]
+
+
+def test_portfolio_build_rebalanced(portfolio_definition, currency, prices):
+    """
+    GIVEN a portfolio definition
+    WHEN portfolio.build is called with a rebalance schedule
+    THEN the turnover is recorded alongside the backtest
+    """
+    cur = Currency.GBP
+    port = Portfolio(portfolio_definition, cur)
+    port.get_usd_converter(currency)
+    port.get_prices(prices)
+    port.build(rebalance="M", transaction_cost=0.001)
+
+    assert len(port.backtest) > 0
+    assert list(port.rebalanced.columns) == [
+        "portfolio_returns",
+        "turnover",
+        "transaction_costs",
+    ]
+
+
+def test_portfolio_lazy_missing_inputs(portfolio_definition, currency, prices):
+    """
+    GIVEN a lazy portfolio of a USD security in GBP
+    WHEN results are read before the FX rates or the benchmark are loaded
+    THEN MissingInput names the loader to run
+    """
+    port = Portfolio(portfolio_definition, Currency.GBP, lazy=True)
+    port.get_prices(prices)
+    with pytest.raises(graph.MissingInput, match="get_usd_converter"):
+        port.backtest
+    port.get_usd_converter(currency)
+    with pytest.raises(graph.MissingInput, match="get_benchmark"):
+        port.benchmark
+
+
+def test_portfolio_rebuild_keeps_asset_returns(portfolio_definition, currency, prices):
+    """
+    GIVEN a built portfolio
+    WHEN it is rebuilt with different rebalance schedules
+    THEN the asset returns are calculated only once
+    """
+    cur = Currency.GBP
+    port = Portfolio(portfolio_definition, cur)
+    port.get_usd_converter(currency)
+    port.get_prices(prices)
+    evaluations = []
+    build_asset_returns = port.graph.computations["asset_returns"]
+    port.graph.computations["asset_returns"] = lambda: (
+        evaluations.append(1) or build_asset_returns()
+    )
+    port.build()
+    monthly = port.build(rebalance="M")
+    port.build(rebalance="Q")
+
+    assert len(evaluations) == 1
+    assert port.rebalancing["frequency"] == "Q"
+    assert len(monthly) > 0
+
+
+def test_portfolio_horizon_analysis(portfolio_definition, currency, prices, benchmark):
+    """
+    GIVEN a portfolio with a benchmark
+    WHEN portfolio.horizon_analysis is called
+    THEN a row is returned for every horizon
+    """
+    cur = Currency.GBP
+    port = Portfolio(portfolio_definition, cur)
+    port.get_usd_converter(currency)
+    port.get_prices(prices)
+    port.build()
+    port.get_benchmark(benchmark)
+    result = port.horizon_analysis(horizon_list=["1D", "SI"])
+
+    assert list(result.index) == ["1D", "SI"]
+    assert "excess" in result
+
+
+def test_portfolio_factor_analysis(portfolio_definition, currency, prices, benchmark):
+    """
+    GIVEN a portfolio with a benchmark and no factors loaded
+    WHEN portfolio.factor_analysis is called
+    THEN every holding and the portfolio are regressed on the market
+    """
+    cur = Currency.GBP
+    port = Portfolio(portfolio_definition, cur)
+    port.get_usd_converter(currency)
+    port.get_prices(prices)
+    port.get_benchmark(benchmark)
+    port.build()
+    result = port.factor_analysis()
+
+    assert list(result.index) == ["TEST", "portfolio_returns"]
+    assert "market" in result
+
+
+def test_portfolio_factor_analysis_resampled(portfolio_definition):
+    """
+    GIVEN daily prices and factor returns
+    WHEN the portfolio is resampled weekly and factor_analysis is called
+    THEN the factors are compounded to the same weeks as the backtest
+    """
+    dates = pd.bdate_range("2023-01-02", periods=40)
+    rng = np.random.default_rng(0)
+    prices, gbpusd = _market(dates, np.cumprod(1 + rng.normal(0, 0.01, 40)), 1.0)
+    port = Portfolio(portfolio_definition, Currency.GBP)
+    port.prices = prices
+    port.gbpusd = gbpusd
+    port.factor_returns = pd.DataFrame(
+        {"market": rng.normal(0, 0.01, 40)}, index=pd.Index(dates, name="Date")
+    )
+    port.resample("W")
+    port.build()
+    result = port.factor_analysis()
+
+    assert result.loc["TEST", "observations"] == len(port.backtest) - 1
+
+
+def test_portfolio_risk_contributions(portfolio_definition, currency, prices):
+    """
+    GIVEN a portfolio that has already been built
+    WHEN portfolio.risk_contributions is called
+    THEN the covariance is cached and contributions returned per security
+    """
+    cur = Currency.GBP
+    port = Portfolio(portfolio_definition, cur)
+    port.get_usd_converter(currency)
+    port.get_prices(prices)
+    port.build()
+    result = port.risk_contributions(method="ewma", decay=0.9)
+    port.risk_contributions(method="ewma", decay=0.9)
+
+    assert list(result.index) == ["TEST"]
+    assert list(port.covariance.columns) == ["TEST"]
+    assert port.cache.hits == 1
+
+
+def test_portfolio_stress_test(portfolio_definition, currency, prices):
+    """
+    GIVEN a portfolio of a USD security in GBP
+    WHEN portfolio.stress_test is called
+    THEN the FX and historical scenarios are applied to its weights
+    """
+    cur = Currency.GBP
+    port = Portfolio(portfolio_definition, cur)
+    port.get_usd_converter(currency)
+    port.get_prices(prices)
+    result = port.stress_test(
+        [
+            {"name": "GBP -20%", "fx": {"gbp": -0.2}},
+            {"name": "replay", "start": "2023-01-02", "end": "2023-01-04"},
+        ]
+    )
+
+    assert list(result.columns) == ["portfolio"]
+    assert result.loc["GBP -20%", "portfolio"] == pytest.approx(0.25)
+    assert result.loc["replay", "portfolio"] == 0
+
+
+def _market(dates, closes, rates):
+    prices = pd.DataFrame(
+        {
+            "TIDM": "TEST",
+            "Date": dates,
+            "Open": closes,
+            "High": closes,
+            "Low": closes,
+            "Close": closes,
+            "Volume": 1,
+            "Adjustment": 1.0,
+        }
+    )
+    return prices, pd.DataFrame({"Convert": rates}, index=pd.Index(dates, name="Date"))
+
+
+@pytest.mark.parametrize(
+    "cur,expected",
+    [(Currency.GBP, [0.1, 0.1]), (Currency.USD, [0.76, 0.1])],
+)
+def test_portfolio_conversion(cur, expected):
+    """
+    GIVEN a GBP security and USD to GBP rates
+    WHEN the portfolio is built in GBP or in USD
+    THEN the returns are unconverted in GBP and converted at the reciprocal
+    rate in USD
+    """
+    dates = pd.bdate_range("2023-01-02", periods=3)
+    prices, gbpusd = _market(dates, [1.0, 1.1, 1.21], [0.8, 0.5, 0.5])
+    port = Portfolio({"TEST": {"weight": 1, "currency": "gbp"}}, cur)
+    port.prices = prices
+    port.gbpusd = gbpusd
+    port.build()
+
+    assert port.asset_returns.TEST.iloc[1:].tolist() == pytest.approx(expected)
+
+
+def test_portfolio_stress_test_matches_backtest():
+    """
+    GIVEN a resampled USD portfolio of a GBP security with GBP to USD rates
+    WHEN its whole history is replayed by stress_test
+    THEN the replay matches the compounded backtest returns
+    """
+    dates = pd.bdate_range("2023-01-02", periods=15)
+    prices, gbpusd = _market(
+        dates, np.linspace(1.0, 1.5, 15), np.linspace(0.8, 0.5, 15)
+    )
+    _, usdgbp = _market(dates, 1.0, np.linspace(1.2, 1.4, 15))
+    port = Portfolio({"TEST": {"weight": 1, "currency": "gbp"}}, Currency.USD)
+    port.prices = prices
+    port.gbpusd = gbpusd
+    port.usdgbp = usdgbp
+    port.resample("W")
+    port.build()
+    returns = port.backtest.portfolio_returns
+    result = port.stress_test([{"start": returns.index[0], "end": returns.index[-1]}])
+
+    expected = (1 + returns.iloc[1:]).prod() - 1
+    assert result.iloc[0, 0] == pytest.approx(expected)
+
+
+def test_portfolio_resample(portfolio_definition, currency, prices, benchmark):
+    """
+    GIVEN daily prices
+    WHEN the portfolio is resampled weekly before it is built
+    THEN the backtest has a row per week
+    """
+    cur = Currency.GBP
+    port = Portfolio(portfolio_definition, cur)
+    port.get_usd_converter(currency)
+    port.get_prices(prices)
+    port.get_benchmark(benchmark)
+    port.resample("W")
+    port.build()
+
+    assert list(port.backtest.index.day) == [1, 8]
+    assert "benchmark_returns" in port.backtest
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from invest_tools import rebalance
+
+
+@pytest.fixture()
+def asset_returns():
+    rng = np.random.default_rng(0)
+    index = pd.bdate_range("2023-01-02", periods=130)
+    return pd.DataFrame(rng.normal(0.0005, 0.02, (130, 3)), index=index)
+
+
+@pytest.fixture()
+def weights():
+    return np.array([0.5, 0.3, 0.2])
+
+
+def loop_backtest(asset_returns, weights, schedule, transaction_cost):
+    holdings = weights.copy()
+    returns = []
+    for t, period_returns in enumerate(asset_returns.to_numpy()):
+        start_value = holdings.sum()
+        holdings = holdings * (1 + period_returns)
+        period_return = holdings.sum() / start_value - 1
+        if schedule[t]:
+            turnover = np.abs(holdings / holdings.sum() - weights).sum()
+            period_return = (1 + period_return) * (1 - transaction_cost * turnover) - 1
+            holdings = weights * holdings.sum() * (1 - transaction_cost * turnover)
+        returns.append(period_return)
+    return np.array(returns)
+
+
+def test_calendar_schedule(asset_returns):
+    """
+    GIVEN a daily index
+    WHEN calendar_schedule is called monthly
+    THEN the last day of every month but the final one is marked
+    """
+    schedule = rebalance.calendar_schedule(asset_returns.index, "M")
+    marked = asset_returns.index[schedule]
+    assert list(marked.month) == [1, 2, 3, 4, 5]
+    assert all(marked.is_month_end | (marked + pd.offsets.BDay()).is_month_start)
+
+
+def test_calendar_schedule_invalid(asset_returns):
+    """
+    GIVEN a daily index
+    WHEN calendar_schedule is called with an unknown frequency
+    THEN InvalidSchedule is raised
+    """
+    with pytest.raises(rebalance.InvalidSchedule):
+        rebalance.calendar_schedule(asset_returns.index, "fortnightly")
+
+
+def test_backtest_daily_matches_fixed_weights(asset_returns, weights):
+    """
+    GIVEN asset returns and weights
+    WHEN backtest_rebalanced is called with daily rebalancing and no costs
+    THEN it matches holding fixed weights
+    """
+    result = rebalance.backtest_rebalanced(asset_returns, weights, frequency="D")
+    expected = asset_returns.mul(weights, axis=1).sum(axis=1)
+    np.testing.assert_allclose(result.portfolio_returns, expected)
+
+
+def test_backtest_monthly_with_costs(asset_returns, weights):
+    """
+    GIVEN asset returns and weights
+    WHEN backtest_rebalanced is called monthly with transaction costs
+    THEN it matches stepping the holdings day by day
+    """
+    result = rebalance.backtest_rebalanced(
+        asset_returns, weights, frequency="M", transaction_cost=0.01
+    )
+    schedule = rebalance.calendar_schedule(asset_returns.index, "M")
+    expected = loop_backtest(asset_returns, weights, schedule, 0.01)
+    np.testing.assert_allclose(result.portfolio_returns, expected)
+    assert (result.turnover > 0).sum() == schedule.sum()
+    np.testing.assert_allclose(result.transaction_costs, result.turnover * 0.01)
+
+
+def test_backtest_threshold(asset_returns, weights):
+    """
+    GIVEN asset returns and weights
+    WHEN backtest_rebalanced is called with a drift threshold
+    THEN it rebalances only when a weight leaves the band
+    """
+    result = rebalance.backtest_rebalanced(asset_returns, weights, threshold=0.02)
+    schedule = (result.turnover > 0).to_numpy()
+    assert 0 < schedule.sum() < len(schedule)
+    expected = loop_backtest(asset_returns, weights, schedule, 0)
+    np.testing.assert_allclose(result.portfolio_returns, expected)
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from invest_tools import resample
+
+
+@pytest.mark.parametrize(
+    "freq,expected", [("B", "D"), ("W", "W"), ("M", "M"), ("Q", "Q"), ("A", "A")]
+)
+def test_infer_frequency(freq, expected):
+    """
+    GIVEN dates at a regular frequency
+    WHEN infer_frequency is called
+    THEN the frequency is detected
+    """
+    dates = pd.Series(pd.date_range("2020-01-01", periods=30, freq=freq))
+    assert resample.infer_frequency(dates) == expected
+
+
+def test_periods_per_year_invalid():
+    """
+    GIVEN an unknown frequency
+    WHEN periods_per_year is called
+    THEN InvalidFrequency is raised
+    """
+    with pytest.raises(resample.InvalidFrequency):
+        resample.periods_per_year("H")
+
+
+def test_resample_prices():
+    """
+    GIVEN intraday prices of two securities
+    WHEN resample_prices is called with a daily frequency
+    THEN each security has one row a day reduced from that day's rows
+    """
+    dates = pd.date_range("2023-01-02 09:00", periods=6, freq="6H")
+    prices = pd.DataFrame(
+        {
+            "TIDM": ["A"] * 6 + ["B"] * 6,
+            "Date": dates.append(dates),
+            "High": np.arange(12.0),
+            "Close": np.arange(12.0),
+            "Volume": 1.0,
+            "Adjustment": 1.0,
+        }
+    ).sample(frac=1, random_state=0)
+    result = resample.resample_prices(prices, "D")
+    assert list(result.columns) == list(prices.columns)
+    assert list(result.TIDM) == ["A", "A", "B", "B"]
+    assert list(result.Date.dt.day) == [2, 3, 2, 3]
+    assert list(result.Close) == [2.0, 5.0, 8.0, 11.0]
+    assert list(result.Volume) == [3.0, 3.0, 3.0, 3.0]
+
+
+def test_resample_levels_and_returns():
+    """
+    GIVEN daily rates and returns
+    WHEN they are resampled weekly
+    THEN rates keep the last level and returns compound over each week
+    """
+    index = pd.DatetimeIndex(
+        ["2023-01-02", "2023-01-03", "2023-01-09", "2023-01-10"], name="Date"
+    )
+    rates = pd.DataFrame({"Convert": [1.0, 2.0, 3.0, 4.0]}, index=index)
+    returns = pd.DataFrame({"benchmark_returns": [0.1, 0.1, np.nan, 0.1]}, index=index)
+    week_ends = pd.DatetimeIndex(["2023-01-08", "2023-01-15"], name="Date")
+
+    levels = resample.resample_levels(rates, "W")
+    compounded = resample.resample_returns(returns, "W")
+    pd.testing.assert_index_equal(levels.index, week_ends)
+    assert list(levels.Convert) == [2.0, 4.0]
+    pd.testing.assert_index_equal(compounded.index, week_ends)
+    assert np.allclose(compounded.benchmark_returns, [0.21, 0.1])
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from invest_tools import risk
+
+
+@pytest.fixture()
+def returns():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        rng.multivariate_normal(
+            [0, 0, 0], [[1, 0.5, 0.2], [0.5, 2, 0.1], [0.2, 0.1, 0.5]], 250
+        )
+        / 100,
+        columns=["a", "b", "c"],
+    )
+    df.iloc[:20, 1] = np.nan
+    return df
+
+
+def test_sample_covariance(returns):
+    """
+    GIVEN returns with missing values
+    WHEN sample_covariance is called with small blocks
+    THEN it matches the pairwise pandas covariance
+    """
+    result = risk.sample_covariance(returns, block_size=2)
+    pd.testing.assert_frame_equal(result, returns.cov())
+
+
+def test_ewma_covariance(returns):
+    """
+    GIVEN returns
+    WHEN ewma_covariance is called
+    THEN it matches a covariance weighted by the decay
+    """
+    filled = returns.fillna(returns.mean())
+    weights = 0.9 ** np.arange(len(returns))[::-1]
+    expected = np.cov(filled.T, aweights=weights, ddof=0)
+    assert np.allclose(risk.ewma_covariance(returns, decay=0.9), expected)
+
+
+def test_ledoit_wolf_covariance():
+    """
+    GIVEN more assets than periods
+    WHEN ledoit_wolf_covariance is called
+    THEN the shrunk covariance is full rank with the sample's average variance
+    """
+    rng = np.random.default_rng(1)
+    returns = pd.DataFrame(rng.normal(0, 0.01, (30, 50)))
+    result = risk.ledoit_wolf_covariance(returns).to_numpy()
+    sample = returns.cov(ddof=0).to_numpy()
+    assert np.linalg.matrix_rank(result) == 50
+    assert np.trace(result) == pytest.approx(np.trace(sample))
+
+
+def test_estimate_covariance_invalid(returns):
+    """
+    GIVEN an unknown estimator
+    WHEN estimate_covariance is called
+    THEN InvalidEstimator is raised
+    """
+    with pytest.raises(risk.InvalidEstimator):
+        risk.estimate_covariance(returns, "shrunk")
+
+
+def test_risk_contributions(returns):
+    """
+    GIVEN a covariance matrix and a vector of weights
+    WHEN risk_contributions is called
+    THEN the components sum to the portfolio volatility
+    """
+    covariance = risk.sample_covariance(returns)
+    weights = np.array([0.5, 0.3, 0.2])
+    result = risk.risk_contributions(covariance, weights)
+    volatility = np.sqrt(weights @ covariance.to_numpy() @ weights)
+    assert list(result.index) == ["a", "b", "c"]
+    assert result.component.sum() == pytest.approx(volatility)
+    assert result.percent.sum() == pytest.approx(1)
+
+
+def test_risk_contributions_many(returns):
+    """
+    GIVEN a covariance matrix and a dataframe of weights for many portfolios
+    WHEN risk_contributions is called
+    THEN each portfolio matches its own attribution
+    """
+    covariance = risk.sample_covariance(returns)
+    weights = pd.DataFrame(
+        {"x": [0.5, 0.3, 0.2], "y": [0.0, 0.0, 1.0]}, index=["a", "b", "c"]
+    )
+    result = risk.risk_contributions(covariance, weights)
+    for portfolio in weights:
+        expected = risk.risk_contributions(covariance, weights[portfolio])
+        assert np.allclose(result.loc[portfolio], expected)
+    volatility = risk.portfolio_volatility(covariance, weights)
+    assert np.allclose(result.groupby(level="portfolio").component.sum(), volatility)
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from invest_tools import scenarios
+from invest_tools.currency import Currency
+
+
+@pytest.fixture()
+def currencies():
+    return pd.Series({"A": "gbp", "B": "usd", "C": "usd"})
+
+
+@pytest.fixture()
+def values():
+    index = pd.bdate_range("2020-01-01", periods=10)
+    growth = np.cumprod(np.full((10, 3), 1.01), axis=0)
+    return pd.DataFrame(growth, index=index, columns=["A", "B", "C"])
+
+
+def test_price_matrix():
+    """
+    GIVEN long prices with a missing day for one code
+    WHEN price_matrix is called
+    THEN adjusted prices are pivoted by code with the last price carried over
+    """
+    prices = pd.DataFrame(
+        {
+            "TIDM": ["X", "Y", "X", "X", "Y"],
+            "Date": pd.to_datetime(
+                ["2023-01-02", "2023-01-02", "2023-01-03", "2023-01-04", "2023-01-04"]
+            ),
+            "Close": [1.0, 2.0, 3.0, 4.0, 5.0],
+            "Adjustment": [1.0, 1.0, 1.0, 0.5, 1.0],
+        }
+    )
+    matrix = scenarios.price_matrix(prices)
+    assert list(matrix.X) == [1.0, 3.0, 2.0]
+    assert list(matrix.Y) == [2.0, 2.0, 5.0]
+
+
+def test_conversion_matrix(currencies):
+    """
+    GIVEN a GBP to USD rate with a missing day
+    WHEN conversion_matrix is called for a USD portfolio
+    THEN GBP assets take the last rate and USD assets are unconverted
+    """
+    dates = pd.bdate_range("2023-01-02", periods=3)
+    usdgbp = pd.DataFrame({"Convert": [1.25, 2.0]}, index=dates[:2])
+    rates = scenarios.conversion_matrix(dates, currencies, Currency.USD, usdgbp)
+    assert list(rates.A) == [1.25, 2.0, 2.0]
+    assert list(rates.B) == [1.0, 1.0, 1.0]
+
+
+def test_scenario_shocks(currencies, values):
+    """
+    GIVEN FX, currency, asset, market and historical scenarios
+    WHEN scenario_shocks is called
+    THEN every asset's return compounds the shocks that apply to it
+    """
+    shocks = scenarios.scenario_shocks(
+        [
+            {"name": "gbp", "fx": {"gbp": -0.2}},
+            {"name": "usd", "fx": {"usd": 0.1}, "assets": {"B": -0.5}},
+            {"name": "crash", "market": -0.3, "currencies": {"usd": -0.1}},
+            {"name": "replay", "start": "2020-01-02", "end": "2020-01-06"},
+            {"name": "before", "start": "2019-01-01"},
+        ],
+        currencies,
+        Currency.GBP,
+        values,
+    )
+    assert np.allclose(shocks.loc["gbp"], [0, 0.25, 0.25])
+    assert np.allclose(shocks.loc["usd"], [0, -0.45, 0.1])
+    assert np.allclose(shocks.loc["crash"], [-0.3, -0.37, -0.37])
+    assert np.allclose(shocks.loc["replay"], 1.01**2 - 1)
+    assert shocks.loc["before"].isna().all()
+
+
+def test_scenario_shocks_invalid(currencies):
+    """
+    GIVEN a scenario with an unknown shock
+    WHEN scenario_shocks is called
+    THEN InvalidScenario is raised
+    """
+    with pytest.raises(scenarios.InvalidScenario):
+        scenarios.scenario_shocks([{"rates": 0.01}], currencies, Currency.GBP)
+
+
+def test_evaluate_scenarios(currencies):
+    """
+    GIVEN asset shocks and weights of several portfolios
+    WHEN evaluate_scenarios is called
+    THEN each portfolio return is its weighted asset shocks
+    """
+    shocks = scenarios.scenario_shocks(
+        [{"market": -0.1}, {"assets": {"A": 0.2}}], currencies, Currency.GBP
+    )
+    weights = pd.DataFrame(
+        {"x": [0.5, 0.5, 0.0], "y": [0.0, 0.0, 1.0]}, index=["A", "B", "C"]
+    )
+    result = scenarios.evaluate_scenarios(shocks, weights)
+    assert np.allclose(result.x, [-0.1, 0.1])
+    assert np.allclose(result.y, [-0.1, 0.0])
@@ -0,0 +1,181 @@
+import asyncio
+import json
+
+import pytest
+
+from invest_tools import loaders, service
+
+
+@pytest.fixture()
+def analysis_service(prices, currency, benchmark):
+    market_data = loaders.load_market_data(prices, currency, benchmark)
+    return service.AnalysisService(market_data, max_workers=2)
+
+
+async def _request(port, method, path, body=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = b"" if body is None else json.dumps(body).encode()
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+        f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    status = int(head.split()[1])
+    return status, json.loads(payload)
+
+
+def _run(analysis_service, *requests):
+    async def run():
+        server = await analysis_service.start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await asyncio.gather(*(_request(port, *r) for r in requests))
+
+    return asyncio.run(run())
+
+
+def test_service_health(analysis_service):
+    """
+    GIVEN a running analysis service
+    WHEN the health endpoint is requested
+    THEN it responds ok
+    """
+    [(status, body)] = _run(analysis_service, ("GET", "/health"))
+    assert status == 200
+    assert body == {"status": "ok"}
+
+
+def test_service_analyse(analysis_service, portfolio_definition):
+    """
+    GIVEN a running analysis service
+    WHEN a portfolio is analysed and then analysed again
+    THEN the metrics are returned and the warm portfolio is reused
+    """
+    request = {"portfolio": portfolio_definition, "metrics": ["daily_returns"]}
+    [(status, body)] = _run(analysis_service, ("POST", "/analyse", request))
+    assert status == 200
+    assert body == {"analysis": {"daily_returns": 0}}
+    _run(analysis_service, ("POST", "/benchmark_analysis", request))
+    assert len(analysis_service.portfolios) == 1
+
+
+def test_service_coalesces_requests(analysis_service, portfolio_definition):
+    """
+    GIVEN an analysis service
+    WHEN identical requests arrive together
+    THEN they are answered from a single evaluation
+    """
+    body = json.dumps({"portfolio": portfolio_definition}).encode()
+
+    async def run():
+        return await asyncio.gather(
+            *(analysis_service.dispatch("POST", "/build", body) for _ in range(3))
+        )
+
+    responses = asyncio.run(run())
+    assert responses[0] == responses[1] == responses[2]
+    assert analysis_service.evaluations == 1
+    assert analysis_service.in_flight == {}
+
+
+@pytest.mark.parametrize(
+    "method,path,body,status",
+    [
+        ("POST", "/unknown", {}, 404),
+        ("GET", "/analyse", None, 405),
+        ("POST", "/analyse", {"currency": "gbp"}, 400),
+        ("POST", "/analyse", {"portfolio": ["TEST"]}, 400),
+        ("POST", "/analyse", {"portfolio": {"TEST": {"weight": 0.5}}}, 400),
+        ("POST", "/analyse", {"portfolio": {}, "currency": "eur"}, 400),
+        ("POST", "/analyse", {"portfolio": {}, "metrics": "daily_returns"}, 400),
+        ("POST", "/benchmark_analysis", {"portfolio": {}, "as_of": "never"}, 400),
+    ],
+)
+def test_service_errors(analysis_service, method, path, body, status):
+    """
+    GIVEN a running analysis service
+    WHEN an invalid request is made
+    THEN an error status and message are returned
+    """
+    [(response_status, response)] = _run(analysis_service, (method, path, body))
+    assert response_status == status
+    assert "error" in response
+
+
+def test_service_internal_error(analysis_service, portfolio_definition, monkeypatch):
+    """
+    GIVEN an analysis service whose calculation fails unexpectedly
+    WHEN a portfolio is analysed
+    THEN the error is reported as a server error rather than a bad request
+    """
+
+    def fail(*args, **kwargs):
+        raise KeyError("missing")
+
+    monkeypatch.setattr(service.Portfolio, "analyse", fail)
+    request = {"portfolio": portfolio_definition}
+    [(status, body)] = _run(analysis_service, ("POST", "/analyse", request))
+    assert status == 500
+    assert "KeyError" in body["error"]
+
+
+def test_service_evicts_least_recently_used(prices, currency, benchmark):
+    """
+    GIVEN an analysis service holding at most two portfolios
+    WHEN a third portfolio is built after the first is used again
+    THEN the least recently used portfolio is evicted
+    """
+    market_data = loaders.load_market_data(prices, currency, benchmark)
+    analysis_service = service.AnalysisService(market_data, max_portfolios=2)
+    requests = [
+        {"portfolio": {"TEST": {"weight": 1, "currency": "usd"}}, "currency": c}
+        for c in ("gbp", "usd")
+    ]
+    requests.append({**requests[0], "transaction_cost": 0.01})
+    for request in [requests[0], requests[1], requests[0], requests[2]]:
+        analysis_service.build(request)
+    currencies = [port.currency for port, _ in analysis_service.portfolios.values()]
+    assert currencies == [service.Currency.GBP, service.Currency.GBP]
+    assert len(analysis_service.portfolios) == 2
+
+
+def test_service_without_benchmark(prices, currency, portfolio_definition):
+    """
+    GIVEN an analysis service started without a benchmark
+    WHEN the benchmark analysis is requested
+    THEN it is reported as a bad request
+    """
+    market_data = loaders.load_market_data(prices, currency)
+    analysis_service = service.AnalysisService(market_data)
+    request = {"portfolio": portfolio_definition}
+    [(status, body)] = _run(analysis_service, ("POST", "/benchmark_analysis", request))
+    assert status == 400
+    assert "get_benchmark" in body["error"]
+
+
+@pytest.mark.parametrize("length", ["many", "-5"])
+def test_service_invalid_content_length(analysis_service, length):
+    """
+    GIVEN a running analysis service
+    WHEN a request has a Content-Length that is not a count of bytes
+    THEN it is reported as a bad request
+    """
+
+    async def run():
+        server = await analysis_service.start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(
+                f"POST /analyse HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode()
+            )
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            return response
+
+    response = asyncio.run(run())
+    assert response.split()[1] == b"400"